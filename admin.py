@@ -1,8 +1,18 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import sqlite3
+import threading
 from datetime import datetime
 from db_init import DB_NAME
+from db import get_connection, write
+import catalog_search
+from virtual_list import RecycledRowList, VirtualTreeview
+import pagination
+import fines
+import background
+import export_data
+import borrow_return
+import cooccurrence
 
 class AdminPanel:
     def __init__(self, root, username, return_to_dashboard):
@@ -32,30 +42,54 @@ class AdminPanel:
             print(f"Error parsing dates for fine calculation: {e}")
             return 0
 
+    BOOK_COLUMNS = "id, title, author, genre, isbn, publication_year, quantity, available"
+
+    def make_book_row(self, parent):
+        row = tk.Frame(parent, bg="white", relief="flat", highlightbackground="#20c997", highlightthickness=2)
+        row.info_label = tk.Label(row, bg="white", font=("Segoe UI", 12))
+        row.info_label.pack(side="left", padx=15)
+        row.stock_label = tk.Label(row, bg="white", font=("Segoe UI", 12))
+        row.stock_label.pack(side="left", padx=15)
+        row.edit_btn = tk.Button(row, text="Edit", bg="#007bff", fg="white", font=("Segoe UI", 10, "bold"), relief="flat", padx=12, pady=6, cursor="hand2")
+        row.edit_btn.pack(side="right", padx=5)
+        row.delete_btn = tk.Button(row, text="Delete", bg="#dc3545", fg="white", font=("Segoe UI", 10, "bold"), relief="flat", padx=12, pady=6, cursor="hand2")
+        row.delete_btn.pack(side="right", padx=5)
+        return row
+
+    def bind_book_row(self, row, key, book):
+        book_id, title, author, genre, isbn, pub_year, quantity, available = book
+        row.info_label.config(text=f"{title} by {author} ({genre}, ISBN: {isbn})")
+        row.stock_label.config(text=f"Qty: {quantity}, Avail: {available}")
+        row.edit_btn.config(command=lambda b=book_id: self.edit_book(b))
+        row.delete_btn.config(command=lambda b=book_id: self.delete_book(b))
+
+    def count_books(self):
+        with get_connection(self.db_name) as conn:
+            return conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+    def get_books_page(self, cursor=None, page_size=pagination.PAGE_SIZE, offset=0):
+        with get_connection(self.db_name) as conn:
+            return pagination.books(conn, cursor, page_size, offset, columns=self.BOOK_COLUMNS, order=("id",))
+
+    def paged(self, query, **kwargs):
+        """Bind a pagination query to this panel's database for a KeysetSource."""
+        def page_fn(**page):
+            with get_connection(self.db_name) as conn:
+                return query(conn, **kwargs, **page)
+        return page_fn
+
+    def count(self, sql, params=()):
+        with get_connection(self.db_name) as conn:
+            return conn.execute(sql, params).fetchone()[0]
+
     def refresh_book_list(self, search_term=""):
-        for widget in self.book_list_frame.winfo_children():
-            widget.destroy()
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                if search_term:
-                    query = f"%{search_term.lower()}%"
-                    c.execute("""
-                    SELECT id, title, author, genre, isbn, publication_year, quantity, available 
-                    FROM books 
-                    WHERE LOWER(title) LIKE ? OR LOWER(author) LIKE ? OR LOWER(genre) LIKE ? OR LOWER(isbn) LIKE ?
-                    """, (query, query, query, query))
-                else:
-                    c.execute("SELECT id, title, author, genre, isbn, publication_year, quantity, available FROM books")
-                books = c.fetchall()
-            for book in books:
-                book_id, title, author, genre, isbn, pub_year, quantity, available = book
-                row = tk.Frame(self.book_list_frame, bg="white", relief="flat", highlightbackground="#20c997", highlightthickness=2)
-                row.pack(fill="x", pady=8, padx=10)
-                tk.Label(row, text=f"{title} by {author} ({genre}, ISBN: {isbn})", bg="white", font=("Segoe UI", 12)).pack(side="left", padx=15)
-                tk.Label(row, text=f"Qty: {quantity}, Avail: {available}", bg="white", font=("Segoe UI", 12)).pack(side="left", padx=15)
-                tk.Button(row, text="Edit", command=lambda b=book_id: self.edit_book(b), bg="#007bff", fg="white", font=("Segoe UI", 10, "bold"), relief="flat", padx=12, pady=6, cursor="hand2").pack(side="right", padx=5)
-                tk.Button(row, text="Delete", command=lambda b=book_id: self.delete_book(b), bg="#dc3545", fg="white", font=("Segoe UI", 10, "bold"), relief="flat", padx=12, pady=6, cursor="hand2").pack(side="right", padx=5)
+            if search_term.strip():
+                with get_connection(self.db_name) as conn:
+                    books = catalog_search.search_books(conn, search_term, self.BOOK_COLUMNS, catalog_search.RESULT_LIMIT)
+                self.book_list.set_rows(books)
+            else:
+                self.book_list.set_source(self.count_books, pagination.KeysetSource(self.get_books_page).fetch)
         except sqlite3.Error as e:
             messagebox.showerror("Error", f"Failed to load books: {e}")
 
@@ -72,13 +106,10 @@ class AdminPanel:
         try:
             quantity = int(quantity)
             pub_year = int(pub_year) if pub_year else None
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                c.execute("""
-                INSERT INTO books (title, author, isbn, genre, publication_year, quantity, available)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (title, author, isbn, genre, pub_year, quantity, quantity))
-                conn.commit()
+            write(lambda conn: conn.execute("""
+            INSERT INTO books (title, author, isbn, genre, publication_year, quantity, available)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (title, author, isbn, genre, pub_year, quantity, quantity)), self.db_name)
             messagebox.showinfo("Success", "Book added successfully")
             self.title_entry.delete(0, tk.END)
             self.author_entry.delete(0, tk.END)
@@ -97,10 +128,11 @@ class AdminPanel:
     def delete_book(self, book_id):
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this book?"):
             try:
-                with sqlite3.connect(self.db_name) as conn:
-                    c = conn.cursor()
-                    c.execute("DELETE FROM books WHERE id = ?", (book_id,))
-                    conn.commit()
+                def _delete(conn):
+                    conn.execute("DELETE FROM books WHERE id = ?", (book_id,))
+                    if borrow_return.RECOMMENDER_ENGINE == "cooccurrence":
+                        cooccurrence.forget_book(conn, book_id)
+                write(_delete, self.db_name)
                 messagebox.showinfo("Success", "Book deleted successfully")
                 self.refresh_book_list(self.search_var.get())
             except sqlite3.Error as e:
@@ -120,7 +152,7 @@ class AdminPanel:
             try:
                 new_quantity = int(new_quantity)
                 new_pub_year = int(new_pub_year) if new_pub_year else None
-                with sqlite3.connect(self.db_name) as conn:
+                def _update(conn):
                     c = conn.cursor()
                     c.execute("SELECT available FROM books WHERE id = ?", (book_id,))
                     current_available = c.fetchone()[0]
@@ -130,7 +162,7 @@ class AdminPanel:
                     UPDATE books SET title = ?, author = ?, isbn = ?, genre = ?, publication_year = ?, quantity = ?, available = ?
                     WHERE id = ?
                     """, (new_title, new_author, new_isbn, new_genre, new_pub_year, new_quantity, new_available, book_id))
-                    conn.commit()
+                write(_update, self.db_name)
                 messagebox.showinfo("Success", "Book updated successfully")
                 edit_win.destroy()
                 self.refresh_book_list(self.search_var.get())
@@ -142,7 +174,7 @@ class AdminPanel:
                 messagebox.showerror("Error", f"Database error: {e}")
 
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with get_connection(self.db_name) as conn:
                 c = conn.cursor()
                 c.execute("SELECT title, author, isbn, genre, publication_year, quantity FROM books WHERE id = ?", (book_id,))
                 book = c.fetchone()
@@ -191,21 +223,10 @@ class AdminPanel:
 
     def view_fines(self):
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                c.execute("SELECT id, due_date, return_date FROM borrowings")
-                for row in c.fetchall():
-                    borrowing_id, due_date, return_date = row
-                    fine = self.calculate_fine(due_date, return_date)
-                    c.execute("UPDATE borrowings SET fine = ? WHERE id = ?", (fine, borrowing_id))
-                conn.commit()
-                c.execute("""
-                SELECT b.username, bk.title, b.fine
-                FROM borrowings b
-                JOIN books bk ON b.book_id = bk.id
-                WHERE b.fine > 0
-                """)
-                fines = c.fetchall()
+            write(lambda conn: fines.refresh_fines(conn, open_only=False), self.db_name)
+            with get_connection(self.db_name) as conn:
+                fine_count = pagination.count_fines(conn)
+            total_fine = self.count(f"SELECT COALESCE(SUM(b.fine), 0) FROM {pagination.LOANS} WHERE {pagination.FINED}")
             fine_win = tk.Toplevel(self.root)
             fine_win.title("View Fines")
             fine_win.geometry("800x600")
@@ -222,30 +243,22 @@ class AdminPanel:
             fine_tree.column("Fine", width=100)
             fine_tree.pack(fill="both", expand=True, padx=15, pady=10)
 
-            scrollbar = ttk.Scrollbar(fine_win, orient="vertical", command=fine_tree.yview)
+            scrollbar = ttk.Scrollbar(fine_win, orient="vertical")
             scrollbar.pack(side="right", fill="y")
-            fine_tree.configure(yscrollcommand=scrollbar.set)
-
-            for fine in fines:
-                fine_tree.insert("", "end", values=fine)
+            fine_list = VirtualTreeview(fine_tree, scrollbar)
+            source = pagination.KeysetSource(self.paged(pagination.fines))
+            fine_list.set_source(lambda: fine_count, lambda offset, limit: [(key, row[1:]) for key, row in source.fetch(offset, limit)])
 
-            total_fine = sum(f[2] for f in fines)
             tk.Label(fine_win, text=f"Total Fines: Rs. {total_fine}", font=("Segoe UI", 12, "bold"), bg="#e9ecef", fg="#007bff").pack(pady=10)
         except sqlite3.Error as e:
             messagebox.showerror("Error", f"Failed to load fines: {e}")
 
     def view_users(self):
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                c.execute("SELECT username, is_admin FROM users")
-                users = c.fetchall()
-                c.execute("""
-                SELECT b.id, b.username, bk.title, b.borrow_date, b.due_date, b.return_date, b.fine
-                FROM borrowings b
-                JOIN books bk ON b.book_id = bk.id
-                """)
-                borrowings = c.fetchall()
+            user_count = self.count("SELECT COUNT(*) FROM users")
+            with get_connection(self.db_name) as conn:
+                borrowing_count = pagination.count(conn, pagination.LOANS)
+            total_fine = self.count(f"SELECT COALESCE(SUM(b.fine), 0) FROM {pagination.LOANS}")
             user_win = tk.Toplevel(self.root)
             user_win.title("View Users and Borrowings")
             user_win.geometry("1200x800")
@@ -260,13 +273,12 @@ class AdminPanel:
             user_tree.column("Admin", width=100, anchor="center")
             user_tree.pack(fill="x", padx=15, pady=10)
 
-            user_scrollbar = ttk.Scrollbar(user_win, orient="vertical", command=user_tree.yview)
+            user_scrollbar = ttk.Scrollbar(user_win, orient="vertical")
             user_scrollbar.pack(side="right", fill="y")
-            user_tree.configure(yscrollcommand=user_scrollbar.set)
-
-            for user in users:
-                username, is_admin = user
-                user_tree.insert("", "end", values=(username, "Yes" if is_admin else "No"))
+            user_list = VirtualTreeview(user_tree, user_scrollbar)
+            user_source = pagination.KeysetSource(self.paged(pagination.users))
+            user_list.set_source(lambda: user_count, lambda offset, limit: [
+                (key, (username, "Yes" if is_admin else "No")) for key, (username, is_admin) in user_source.fetch(offset, limit)])
 
             # Selection helpers and action buttons
             action_frame = tk.Frame(user_win, bg="#e9ecef")
@@ -283,44 +295,49 @@ class AdminPanel:
                 vals = user_tree.item(sel[0])['values']
                 selected_label.config(text=f"Selected: {vals[0]} (Admin: {vals[1]})")
 
-            user_tree.bind("<<TreeviewSelect>>", on_user_select)
+            user_tree.bind("<<TreeviewSelect>>", on_user_select, add="+")
 
             def delete_selected_user():
-                sel = user_tree.selection()
+                sel = user_list.selected_values()
                 if not sel:
                     messagebox.showwarning("Warning", "Please select a user to delete")
                     return
-                username = user_tree.item(sel[0])['values'][0]
+                username = sel[0]
                 self.delete_user(username)
 
             def toggle_admin_selected():
-                sel = user_tree.selection()
+                sel = user_list.selected_values()
                 if not sel:
                     messagebox.showwarning("Warning", "Please select a user to promote/demote")
                     return
-                username = user_tree.item(sel[0])['values'][0]
+                username = sel[0]
                 if username == self.username:
                     messagebox.showerror("Error", "Cannot change your own admin status while logged in.")
                     return
+                def _toggle(conn):
+                    c = conn.cursor()
+                    c.execute("SELECT is_admin FROM users WHERE username = ?", (username,))
+                    row = c.fetchone()
+                    if not row:
+                        return None, "not_found"
+                    current = row[0]
+                    new = 0 if current else 1
+                    # If demoting an admin, ensure at least one admin remains
+                    if current and new == 0:
+                        c.execute("SELECT COUNT(*) FROM users WHERE is_admin = 1")
+                        admins = c.fetchone()[0]
+                        if admins <= 1:
+                            return None, "last_admin"
+                    c.execute("UPDATE users SET is_admin = ? WHERE username = ?", (new, username))
+                    return new, None
                 try:
-                    with sqlite3.connect(self.db_name) as conn:
-                        c = conn.cursor()
-                        c.execute("SELECT is_admin FROM users WHERE username = ?", (username,))
-                        row = c.fetchone()
-                        if not row:
-                            messagebox.showerror("Error", "User not found")
-                            return
-                        current = row[0]
-                        new = 0 if current else 1
-                        # If demoting an admin, ensure at least one admin remains
-                        if current and new == 0:
-                            c.execute("SELECT COUNT(*) FROM users WHERE is_admin = 1")
-                            admins = c.fetchone()[0]
-                            if admins <= 1:
-                                messagebox.showwarning("Warning", "Cannot demote the last remaining admin.")
-                                return
-                        c.execute("UPDATE users SET is_admin = ? WHERE username = ?", (new, username))
-                        conn.commit()
+                    new, problem = write(_toggle, self.db_name)
+                    if problem == "not_found":
+                        messagebox.showerror("Error", "User not found")
+                        return
+                    if problem == "last_admin":
+                        messagebox.showwarning("Warning", "Cannot demote the last remaining admin.")
+                        return
                     messagebox.showinfo("Success", f"User '{username}' admin status set to {new}.")
                     # refresh list
                     self.view_users()
@@ -351,15 +368,12 @@ class AdminPanel:
             borrow_tree.column("Fine", width=100)
             borrow_tree.pack(fill="both", expand=True, padx=15, pady=10)
 
-            borrow_scrollbar = ttk.Scrollbar(user_win, orient="vertical", command=borrow_tree.yview)
+            borrow_scrollbar = ttk.Scrollbar(user_win, orient="vertical")
             borrow_scrollbar.pack(side="right", fill="y")
-            borrow_tree.configure(yscrollcommand=borrow_scrollbar.set)
-
-            for borrowing in borrowings:
-                return_date = borrowing[5] if borrowing[5] else "Not Returned"
-                borrow_tree.insert("", "end", values=(borrowing[0], borrowing[1], borrowing[2], borrowing[3], borrowing[4], return_date, borrowing[6]))
-
-            total_fine = sum(b[6] for b in borrowings if b[6])
+            borrow_list = VirtualTreeview(borrow_tree, borrow_scrollbar)
+            borrow_source = pagination.KeysetSource(self.paged(pagination.all_borrowings))
+            borrow_list.set_source(lambda: borrowing_count, lambda offset, limit: [
+                (key, (b[0], b[1], b[2], b[3], b[4], b[5] if b[5] else "Not Returned", b[6])) for key, b in borrow_source.fetch(offset, limit)])
             tk.Label(user_win, text=f"Total Fines Across All Users: Rs. {total_fine}", font=("Segoe UI", 12, "bold"), bg="#e9ecef", fg="#007bff").pack(pady=10)
         except sqlite3.Error as e:
             messagebox.showerror("Error", f"Failed to load user information: {e}")
@@ -368,23 +382,132 @@ class AdminPanel:
         if username == self.username:
             messagebox.showerror("Error", "Cannot delete the currently logged-in admin.")
             return
+        def count_active(conn):
+            c = conn.cursor()
+            c.execute("SELECT COUNT(*) FROM borrowings WHERE username = ? AND return_date IS NULL", (username,))
+            return c.fetchone()[0]
+
+        def _delete(conn):
+            # Re-check inside the write transaction: a loan may have started since the prompt
+            active = count_active(conn)
+            if active > 0:
+                return active
+            if borrow_return.RECOMMENDER_ENGINE == "cooccurrence":
+                cooccurrence.forget_user(conn, username)
+            conn.execute("DELETE FROM borrowings WHERE username = ?", (username,))
+            conn.execute("DELETE FROM users WHERE username = ?", (username,))
+            return 0
+
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                c.execute("SELECT COUNT(*) FROM borrowings WHERE username = ? AND return_date IS NULL", (username,))
-                active_borrowings = c.fetchone()[0]
-                if active_borrowings > 0:
-                    messagebox.showwarning("Warning", f"Cannot delete user {username} because they have {active_borrowings} active borrowing(s).")
-                    return
-                if messagebox.askyesno("Confirm", f"Are you sure you want to delete user {username} and their borrowing history?"):
-                    c.execute("DELETE FROM borrowings WHERE username = ?", (username,))
-                    c.execute("DELETE FROM users WHERE username = ?", (username,))
-                    conn.commit()
+            with get_connection(self.db_name) as conn:
+                active_borrowings = count_active(conn)
+            if active_borrowings == 0 and messagebox.askyesno("Confirm", f"Are you sure you want to delete user {username} and their borrowing history?"):
+                active_borrowings = write(_delete, self.db_name)
+                if active_borrowings == 0:
                     messagebox.showinfo("Success", f"User {username} deleted successfully.")
                     self.view_users()
+            if active_borrowings > 0:
+                messagebox.showwarning("Warning", f"Cannot delete user {username} because they have {active_borrowings} active borrowing(s).")
         except sqlite3.Error as e:
             messagebox.showerror("Error", f"Failed to delete user: {e}")
 
+    def export_reports(self):
+        export_win = tk.Toplevel(self.root)
+        export_win.title("Export Data")
+        export_win.geometry("460x330")
+        export_win.configure(bg="#e9ecef")
+
+        tk.Label(export_win, text="Export Reports", font=("Segoe UI", 16, "bold"), bg="#e9ecef", fg="#007bff").grid(row=0, column=0, columnspan=2, sticky="w", padx=15, pady=10)
+        report_var = tk.StringVar(value="borrowings")
+        format_var = tk.StringVar(value="csv")
+        since_var = tk.StringVar()
+        until_var = tk.StringVar()
+        formats = export_data.FORMATS if export_data.PARQUET_AVAILABLE else ("csv",)
+        fields = [
+            ("Report:", ttk.Combobox(export_win, textvariable=report_var, values=sorted(export_data.REPORTS), state="readonly", width=20)),
+            ("Format:", ttk.Combobox(export_win, textvariable=format_var, values=formats, state="readonly", width=20)),
+            ("From (YYYY-MM-DD):", tk.Entry(export_win, textvariable=since_var, font=("Segoe UI", 12), width=20)),
+            ("To (YYYY-MM-DD):", tk.Entry(export_win, textvariable=until_var, font=("Segoe UI", 12), width=20)),
+        ]
+        for i, (label, widget) in enumerate(fields, 1):
+            tk.Label(export_win, text=label, font=("Segoe UI", 12), bg="#e9ecef").grid(row=i, column=0, sticky="w", padx=15, pady=5)
+            widget.grid(row=i, column=1, sticky="w", padx=15, pady=5)
+
+        progress_bar = ttk.Progressbar(export_win, mode="determinate", length=420)
+        progress_bar.grid(row=5, column=0, columnspan=2, padx=15, pady=(15, 5))
+        status_label = tk.Label(export_win, text="", font=("Segoe UI", 11), bg="#e9ecef")
+        status_label.grid(row=6, column=0, columnspan=2, padx=15)
+        button_frame = tk.Frame(export_win, bg="#e9ecef")
+        button_frame.grid(row=7, column=0, columnspan=2, pady=10)
+
+        # Written by the worker thread, read by the Tk thread in show_progress()
+        state = {"rows": 0, "total": 0, "cancel": None}
+
+        def on_progress(rows, total, seconds):
+            state["rows"], state["total"] = rows, total
+
+        def show_progress():
+            if state["cancel"] is None or not export_win.winfo_exists():
+                return
+            if state["total"]:
+                progress_bar["value"] = 100 * state["rows"] / state["total"]
+            status_label.config(text=f"Exported {state['rows']} of {state['total']} rows")
+            export_win.after(200, show_progress)
+
+        def finish(message):
+            state["cancel"] = None
+            export_btn.config(state="normal")
+            cancel_btn.config(state="disabled")
+            status_label.config(text=message)
+
+        def on_done(counts):
+            progress_bar["value"] = 100
+            finish(f"Exported {counts['rows']} rows in {counts['seconds']:.1f}s")
+            messagebox.showinfo("Success", f"Exported {counts['rows']} rows to {counts['path']}", parent=export_win)
+
+        def on_error(error):
+            if isinstance(error, export_data.ExportCancelled):
+                finish("Export cancelled")
+                return
+            finish("Export failed")
+            messagebox.showerror("Error", f"Failed to export {report_var.get()}: {error}", parent=export_win)
+
+        def start_export():
+            try:
+                since = export_data.parse_date(since_var.get().strip()) if since_var.get().strip() else None
+                until = export_data.parse_date(until_var.get().strip()) if until_var.get().strip() else None
+            except ValueError:
+                messagebox.showerror("Error", "Dates must be in YYYY-MM-DD format", parent=export_win)
+                return
+            fmt = format_var.get()
+            path = filedialog.asksaveasfilename(parent=export_win, defaultextension="." + fmt,
+                                                initialfile=f"{report_var.get()}.{fmt}",
+                                                filetypes=[(fmt.upper(), "*." + fmt)])
+            if not path:
+                return
+            state.update(rows=0, total=0, cancel=threading.Event())
+            progress_bar["value"] = 0
+            export_btn.config(state="disabled")
+            cancel_btn.config(state="normal")
+            background.run(export_win, export_data.export, report_var.get(), path, self.db_name, fmt, since, until,
+                           export_data.EXPORT_PAGE_SIZE, on_progress, state["cancel"],
+                           on_done=on_done, on_error=on_error)
+            show_progress()
+
+        def cancel_export():
+            if state["cancel"] is not None:
+                state["cancel"].set()
+
+        def close():
+            cancel_export()
+            export_win.destroy()
+
+        export_btn = tk.Button(button_frame, text="Export", command=start_export, font=("Segoe UI", 12, "bold"), bg="#28a745", fg="white", relief="flat", padx=20, pady=8, cursor="hand2")
+        export_btn.pack(side="left", padx=10)
+        cancel_btn = tk.Button(button_frame, text="Cancel", command=cancel_export, state="disabled", font=("Segoe UI", 12, "bold"), bg="#dc3545", fg="white", relief="flat", padx=20, pady=8, cursor="hand2")
+        cancel_btn.pack(side="left", padx=10)
+        export_win.protocol("WM_DELETE_WINDOW", close)
+
     def setup_gui(self):
         self.root.title("Admin Panel - A&Y Library")
         self.root.geometry("900x700")
@@ -396,6 +519,7 @@ class AdminPanel:
         tk.Label(header_frame, text="Admin Panel", font=("Segoe UI", 24, "bold"), bg="#007bff", fg="white").pack(side="left", padx=20, pady=15)
         tk.Button(header_frame, text="Back to Dashboard", command=self.return_to_dashboard, font=("Segoe UI", 12, "bold"), bg="#6c757d", fg="white", relief="flat", padx=20, pady=10, cursor="hand2").pack(side="right", padx=10)
         tk.Button(header_frame, text="View Users", command=self.view_users, font=("Segoe UI", 12, "bold"), bg="#17a2b8", fg="white", relief="flat", padx=20, pady=10, cursor="hand2").pack(side="right", padx=10)
+        tk.Button(header_frame, text="Export Data", command=self.export_reports, font=("Segoe UI", 12, "bold"), bg="#28a745", fg="white", relief="flat", padx=20, pady=10, cursor="hand2").pack(side="right", padx=10)
         tk.Button(header_frame, text="View Fines", command=self.view_fines, font=("Segoe UI", 12, "bold"), bg="#ffc107", fg="white", relief="flat", padx=20, pady=10, cursor="hand2").pack(side="right", padx=10)
 
         # Search Bar
@@ -430,16 +554,14 @@ class AdminPanel:
         self.quantity_entry.grid(row=2, column=3, pady=8)
         tk.Button(form_frame, text="Add Book", command=self.add_book, font=("Segoe UI", 12, "bold"), bg="#20c997", fg="white", relief="flat", padx=20, pady=10, cursor="hand2").grid(row=3, column=3, pady=15, sticky="e")
 
-        # Book List
-        canvas_frame = tk.Frame(self.root, bg="#e9ecef")
-        canvas_frame.pack(fill="both", expand=True, padx=20, pady=15)
-        canvas = tk.Canvas(canvas_frame, bg="#e9ecef", highlightthickness=0)
-        scrollbar = ttk.Scrollbar(canvas_frame, orient="vertical", command=canvas.yview)
-        self.book_list_frame = tk.Frame(canvas, bg="#e9ecef")
-        self.book_list_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas.create_window((0, 0), window=self.book_list_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        canvas.pack(side="left", fill="both", expand=True)
+        # Book List: a fixed pool of row widgets re-bound on scroll/search instead of rebuilt
+        list_frame = tk.Frame(self.root, bg="#e9ecef")
+        list_frame.pack(fill="both", expand=True, padx=20, pady=15)
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical")
         scrollbar.pack(side="right", fill="y")
+        self.book_list_frame = tk.Frame(list_frame, bg="#e9ecef")
+        self.book_list_frame.pack_propagate(False)
+        self.book_list_frame.pack(side="left", fill="both", expand=True)
+        self.book_list = RecycledRowList(self.book_list_frame, scrollbar, self.make_book_row, self.bind_book_row)
 
         self.refresh_book_list()
@@ -7,7 +7,7 @@ USAGE: run from project root (the script expects db_init.DB_NAME)
 import shutil
 import os
 import sqlite3
-import bcrypt
+import auth_policy
 from db_init import DB_NAME
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
@@ -23,7 +23,8 @@ def backup_db():
     print(f"Backup created: {BACKUP_PATH}")
 
 def reset_passwords():
-    hashed = bcrypt.hashpw(TEST_PASSWORD.encode('utf-8'), bcrypt.gensalt())
+    # Cost calibrated for this machine, same as newly registered accounts
+    hashed = auth_policy.hash_password(TEST_PASSWORD)
     updated = []
     conn = sqlite3.connect(DB_PATH)
     try:
@@ -0,0 +1,139 @@
+"""
+Password hashing policy: bcrypt cost calibrated to a latency budget.
+
+Instead of bcrypt's fixed default cost, the cost is chosen by timing bcrypt
+on this machine once per process and taking the highest cost whose hash
+still fits LATENCY_BUDGET_MS (never below MIN_ROUNDS). The cost is stored
+in each hash as usual, and login_user() calls needs_rehash() after a
+successful check, so stored hashes follow the current cost, up or down,
+the next time their owner logs in. Calibration can come out one step apart
+between restarts or between a fast and a slow terminal, so a hash is only
+redone when its cost is below MIN_ROUNDS or more than REHASH_SLACK steps
+away from the calibrated cost in either direction; otherwise users would be
+rehashed back and forth.
+
+Every check is timed; recent timings are kept in login_timings for
+monitoring and summarized by timing_stats(). reject_unknown() waits as long
+as a typical check takes without doing one, so a login for an account that
+does not exist costs no CPU and cannot be told apart by its timing.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+# Target time for one hash/check on this machine
+LATENCY_BUDGET_MS = 250
+# Never go below this cost, however slow the machine (OWASP minimum for bcrypt)
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+# Cost used for the calibration run; each extra round doubles the time
+CALIBRATION_ROUNDS = 8
+# Set to a cost to skip calibration (e.g. to keep all terminals identical)
+FIXED_ROUNDS = None
+# Cost steps a stored hash may be above or below the calibrated cost before it is redone
+REHASH_SLACK = 1
+
+# Recent password checks: (username, seconds, cost, rehashed)
+login_timings = deque(maxlen=1000)
+
+_rounds = None
+_calibration_ms = None
+_lock = threading.Lock()
+
+
+def calibrate(budget_ms=LATENCY_BUDGET_MS):
+    """Highest bcrypt cost whose hash time on this machine fits budget_ms."""
+    salt = bcrypt.gensalt(rounds=CALIBRATION_ROUNDS)
+    bcrypt.hashpw(b"warm-up", salt)
+    started = time.perf_counter()
+    bcrypt.hashpw(b"calibration", salt)
+    base_ms = (time.perf_counter() - started) * 1000
+    rounds = CALIBRATION_ROUNDS
+    while rounds < MAX_ROUNDS and base_ms * 2 ** (rounds + 1 - CALIBRATION_ROUNDS) <= budget_ms:
+        rounds += 1
+    rounds = max(MIN_ROUNDS, rounds)
+    global _calibration_ms
+    _calibration_ms = base_ms
+    logger.info("bcrypt cost %d chosen (cost %d took %.1fms, budget %dms)", rounds, CALIBRATION_ROUNDS,
+                base_ms, budget_ms)
+    return rounds
+
+
+def current_rounds():
+    global _rounds
+    if FIXED_ROUNDS is not None:
+        return FIXED_ROUNDS
+    with _lock:
+        if _rounds is None:
+            _rounds = calibrate()
+        return _rounds
+
+
+def _as_bytes(value):
+    return value.encode() if isinstance(value, str) else value
+
+
+def hash_password(password):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=current_rounds()))
+
+
+def rounds_of(hashed):
+    """The cost stored in a bcrypt hash ($2b$<cost>$...)."""
+    try:
+        return int(_as_bytes(hashed).split(b"$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed):
+    rounds = rounds_of(hashed)
+    return rounds is None or rounds < MIN_ROUNDS or abs(rounds - current_rounds()) > REHASH_SLACK
+
+
+def check_password(password, hashed):
+    """(matches, seconds taken) for password against a stored hash."""
+    started = time.perf_counter()
+    try:
+        ok = bcrypt.checkpw(password.encode(), _as_bytes(hashed))
+    except ValueError:
+        ok = False   # not a bcrypt hash
+    return ok, time.perf_counter() - started
+
+
+def record_login(username, seconds, hashed, rehashed):
+    login_timings.append((username, seconds, rounds_of(hashed), rehashed))
+    logger.debug("Password check for %s took %.1fms (cost %s%s)", username, seconds * 1000, rounds_of(hashed),
+                 ", rehashed" if rehashed else "")
+
+
+def expected_check_seconds():
+    """How long a password check at the current cost takes here (median of recent checks, or estimated)."""
+    rounds = current_rounds()
+    recent = sorted(t[1] for t in login_timings if t[2] == rounds)
+    if recent:
+        return recent[len(recent) // 2]
+    if _calibration_ms is None:
+        calibrate()
+    return _calibration_ms * 2 ** (rounds - CALIBRATION_ROUNDS) / 1000
+
+
+def reject_unknown():
+    """Spend the time of a password check without the CPU, for usernames that do not exist."""
+    time.sleep(expected_check_seconds())
+
+
+def timing_stats():
+    """Count, mean and 95th percentile (ms) of the recorded password checks."""
+    times = sorted(t[1] * 1000 for t in login_timings)
+    if not times:
+        return {"count": 0, "mean_ms": 0.0, "p95_ms": 0.0}
+    return {
+        "count": len(times),
+        "mean_ms": sum(times) / len(times),
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))],
+    }
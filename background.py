@@ -0,0 +1,116 @@
+"""
+Run slow work off the Tk event loop and hand the result back to Tk.
+
+Tkinter widgets may only be touched from the thread running mainloop(), so
+work submitted here runs on a small pool of long-lived worker threads (they
+keep their database connections between jobs) while the widget polls for
+the result with after(). on_done / on_error are then called on the Tk
+thread. A task is cancelled automatically when its widget is destroyed, so
+a window closed before its result arrives is never updated.
+
+    task = background.run(window, compute, on_done=show, on_error=report)
+    ...
+    task.cancel()
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+POLL_MS = 50
+WORKERS = 2
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="background")
+    return _executor
+
+
+def _unbind(widget, sequence, funcid):
+    """Remove one handler added with bind(..., add="+").
+
+    Misc.unbind(sequence, funcid) clears every handler of the sequence
+    before Python 3.13, including ones other code added to the widget.
+    """
+    prefix = f'if {{"[{funcid} '
+    kept = "\n".join(line for line in widget.bind(sequence).split("\n") if not line.startswith(prefix))
+    widget.bind(sequence, kept if kept.strip() else "")
+    widget.deletecommand(funcid)
+
+
+class Task:
+    def __init__(self, widget, future, on_done, on_error, poll_ms):
+        self.widget = widget
+        self.future = future
+        self.on_done = on_done
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+        self.cancelled = False
+        self._after_id = None
+        self._destroy_id = widget.bind("<Destroy>", self._on_destroy, add="+")
+        self._poll()
+
+    def _release(self):
+        # Drop our <Destroy> handler so a long-lived widget does not collect one per task
+        if self._destroy_id is not None:
+            try:
+                _unbind(self.widget, "<Destroy>", self._destroy_id)
+            except Exception:
+                pass
+            self._destroy_id = None
+
+    def _poll(self):
+        self._after_id = None
+        if self.cancelled:
+            return
+        if not self.future.done():
+            self._after_id = self.widget.after(self.poll_ms, self._poll)
+            return
+        self._release()
+        try:
+            result = self.future.result()
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(e)
+            else:
+                logger.exception("Background task failed: %s", e)
+            return
+        if self.on_done is not None:
+            self.on_done(result)
+
+    def _on_destroy(self, event):
+        # <Destroy> is also delivered for every child of a toplevel
+        if event.widget is self.widget:
+            self._destroy_id = None   # Tk drops the bindings of a destroyed widget itself
+            self.cancel()
+
+    def cancel(self):
+        """Stop waiting; the callbacks will not run. Work already running still finishes."""
+        if self.cancelled:
+            return
+        self.cancelled = True
+        self.future.cancel()
+        self._release()
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def done(self):
+        return self.cancelled or self.future.done()
+
+
+def submit(fn, *args):
+    """Run fn(*args) on a worker thread with no widget to report back to. Returns the Future."""
+    return _get_executor().submit(fn, *args)
+
+
+def run(widget, fn, *args, on_done=None, on_error=None, poll_ms=POLL_MS):
+    """Run fn(*args) on a worker thread; call on_done(result) or on_error(exc) on widget's Tk thread."""
+    return Task(widget, _get_executor().submit(fn, *args), on_done, on_error, poll_ms)
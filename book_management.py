@@ -3,6 +3,12 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 from db_init import DB_NAME
+from db import get_connection, write
+import catalog_search
+import cooccurrence
+import borrow_return
+from virtual_list import VirtualTreeview
+import pagination
 
 class BookManagement:
     def __init__(self):
@@ -18,78 +24,89 @@ class BookManagement:
             ("The Hobbit", "J.R.R. Tolkien", "9780547928227", "Fantasy", 1937, 6),
             # Add more sample books as needed
         ]
+        def _insert_samples(conn):
+            c = conn.cursor()
+            for book in sample_books:
+                try:
+                    c.execute("""
+                    INSERT INTO books 
+                    (title, author, isbn, genre, publication_year, quantity)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """, book)
+                except sqlite3.IntegrityError:
+                    continue
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                for book in sample_books:
-                    try:
-                        c.execute("""
-                        INSERT INTO books 
-                        (title, author, isbn, genre, publication_year, quantity)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                        """, book)
-                    except sqlite3.IntegrityError:
-                        continue
-                conn.commit()
+            write(_insert_samples, self.db_name)
         except sqlite3.Error as e:
             print(f"Error adding sample books: {e}")
 
     def add_book(self, title, author, isbn, genre, publication_year, quantity):
+        def _add(conn):
+            conn.execute("""
+            INSERT INTO books (title, author, isbn, genre, publication_year, quantity, available)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (title, author, isbn, genre, publication_year, quantity, quantity))
+            return True
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                c.execute("""
-                INSERT INTO books (title, author, isbn, genre, publication_year, quantity, available)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (title, author, isbn, genre, publication_year, quantity, quantity))
-                conn.commit()
-                return True
+            return write(_add, self.db_name)
         except sqlite3.Error:
             return False
 
     def get_all_books(self):
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with get_connection(self.db_name) as conn:
                 c = conn.cursor()
                 c.execute("SELECT * FROM books ORDER BY title")
                 return c.fetchall()
         except sqlite3.Error:
             return []
 
+    def count_books(self):
+        try:
+            with get_connection(self.db_name) as conn:
+                return conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def get_books_page(self, cursor=None, page_size=pagination.PAGE_SIZE, offset=0):
+        """One page of the catalog ordered by (title, id); see pagination.py."""
+        try:
+            with get_connection(self.db_name) as conn:
+                return pagination.books(conn, cursor, page_size, offset)
+        except sqlite3.Error:
+            return pagination.Page([], None)
+
     def search_books(self, query):
+        if not query.strip():
+            return self.get_all_books()
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                c.execute("""
-                SELECT * FROM books 
-                WHERE title LIKE ? OR author LIKE ? OR isbn LIKE ? OR genre LIKE ?
-                ORDER BY title
-                """, (f'%{query}%', f'%{query}%', f'%{query}%', f'%{query}%'))
-                return c.fetchall()
+            with get_connection(self.db_name) as conn:
+                return catalog_search.search_books(conn, query, limit=catalog_search.RESULT_LIMIT)
         except sqlite3.Error:
             return []
 
     def update_book(self, book_id, title, author, isbn, genre, publication_year, quantity):
+        def _update(conn):
+            conn.execute("""
+            UPDATE books 
+            SET title=?, author=?, isbn=?, genre=?, publication_year=?, quantity=?, available=?
+            WHERE id=?
+            """, (title, author, isbn, genre, publication_year, quantity, quantity, book_id))
+            return True
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                c.execute("""
-                UPDATE books 
-                SET title=?, author=?, isbn=?, genre=?, publication_year=?, quantity=?, available=?
-                WHERE id=?
-                """, (title, author, isbn, genre, publication_year, quantity, quantity, book_id))
-                conn.commit()
-                return True
+            return write(_update, self.db_name)
         except sqlite3.Error:
             return False
 
     def delete_book(self, book_id):
+        def _delete(conn):
+            c = conn.cursor()
+            c.execute("DELETE FROM books WHERE id=?", (book_id,))
+            if borrow_return.RECOMMENDER_ENGINE == "cooccurrence":
+                cooccurrence.forget_book(conn, book_id)
+            return c.rowcount > 0
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                c.execute("DELETE FROM books WHERE id=?", (book_id,))
-                conn.commit()
-                return c.rowcount > 0
+            return write(_delete, self.db_name)
         except sqlite3.Error:
             return False
 
@@ -137,9 +154,9 @@ class BookManagementGUI:
         self.tree.column("Available", width=80)
         self.tree.pack(fill="both", expand=True)
 
-        scrollbar = ttk.Scrollbar(main_container, orient="vertical", command=self.tree.yview)
+        scrollbar = ttk.Scrollbar(main_container, orient="vertical")
         scrollbar.pack(side="right", fill="y")
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.book_list = VirtualTreeview(self.tree, scrollbar)
 
         button_frame = tk.Frame(main_container, bg="#f0f2f5")
         button_frame.pack(pady=20)
@@ -152,19 +169,18 @@ class BookManagementGUI:
         self.load_books()
 
     def load_books(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        books = self.book_manager.get_all_books()
-        for book in books:
-            self.tree.insert("", "end", values=book)
+        if self.search_var.get().strip():
+            self.on_search_change()
+            return
+        source = pagination.KeysetSource(self.book_manager.get_books_page)
+        self.book_list.set_source(self.book_manager.count_books, source.fetch)
 
     def on_search_change(self, *args):
         query = self.search_var.get()
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        books = self.book_manager.search_books(query)
-        for book in books:
-            self.tree.insert("", "end", values=book)
+        if not query.strip():
+            self.load_books()
+            return
+        self.book_list.set_rows(self.book_manager.search_books(query))
 
     def show_add_book_dialog(self):
         dialog = tk.Toplevel(self.root)
@@ -201,11 +217,11 @@ class BookManagementGUI:
         tk.Button(dialog, text="Save", command=save_book, font=("Segoe UI", 12, "bold"), bg="#34a853", fg="white", relief="flat").pack(pady=20)
 
     def show_edit_book_dialog(self):
-        selected = self.tree.selection()
-        if not selected:
+        current_values = self.book_list.selected_values()
+        if not current_values:
             messagebox.showwarning("Warning", "Please select a book to edit")
             return
-        book_id = self.tree.item(selected[0])["values"][0]
+        book_id = current_values[0]
         dialog = tk.Toplevel(self.root)
         dialog.title("Edit Book")
         dialog.geometry("400x500")
@@ -219,7 +235,6 @@ class BookManagementGUI:
             entry.pack()
             entries[field] = entry
 
-        current_values = self.tree.item(selected[0])["values"]
         entries["title"].insert(0, current_values[1])
         entries["author"].insert(0, current_values[2])
         entries["isbn"].insert(0, current_values[3])
@@ -249,12 +264,12 @@ class BookManagementGUI:
         tk.Button(dialog, text="Save Changes", command=save_changes, font=("Segoe UI", 12, "bold"), bg="#1a73e8", fg="white", relief="flat").pack(pady=20)
 
     def delete_selected_book(self):
-        selected = self.tree.selection()
+        selected = self.book_list.selected_values()
         if not selected:
             messagebox.showwarning("Warning", "Please select a book to delete")
             return
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this book?"):
-            book_id = self.tree.item(selected[0])["values"][0]
+            book_id = selected[0]
             if self.book_manager.delete_book(book_id):
                 self.load_books()
                 messagebox.showinfo("Success", "Book deleted successfully!")
@@ -4,10 +4,18 @@ from tkinter import ttk, messagebox
 import sqlite3
 from datetime import datetime, timedelta
 from db_init import DB_NAME
-import pandas as pd
-import numpy as np
-from scipy.sparse import csr_matrix
-from scipy.sparse.linalg import svds
+from db import get_connection, write
+from search_index import BookSearchIndex
+from virtual_list import VirtualTreeview
+import pagination
+import fines
+import cooccurrence
+import background
+import startup
+
+# Which engine get_recommended_books uses: "svd" (recommender.py, loaded on
+# first use) or "cooccurrence" (item-item neighbours, see cooccurrence.py)
+RECOMMENDER_ENGINE = "svd"
 
 # Simple logging for debugging
 logger = logging.getLogger(__name__)
@@ -49,82 +57,73 @@ class BorrowReturnSystem:
             return 0
 
     def update_fines(self, borrowing_id=None):
+        # One set-based UPDATE in SQLite (see fines.py) instead of a Python pass per loan
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                if borrowing_id:
-                    c.execute("SELECT due_date, return_date FROM borrowings WHERE id = ?", (borrowing_id,))
-                    due_date, return_date = c.fetchone()
-                    fine = self.calculate_fine(due_date, return_date)
-                    c.execute("UPDATE borrowings SET fine = ? WHERE id = ?", (fine, borrowing_id))
-                else:
-                    c.execute("SELECT id, due_date, return_date FROM borrowings WHERE return_date IS NULL")
-                    for borrowing_id, due_date, _ in c.fetchall():
-                        fine = self.calculate_fine(due_date)
-                        c.execute("UPDATE borrowings SET fine = ? WHERE id = ?", (fine, borrowing_id))
-                conn.commit()
+            write(lambda conn: fines.refresh_fines(conn, borrowing_id or None), self.db_name)
         except sqlite3.Error as e:
             print(f"Error updating fines: {e}")
 
     def borrow_book(self, book_id, username):
         logger.debug("borrow_book called with book_id=%s username=%s", book_id, username)
+        def _borrow(conn):
+            c = conn.cursor()
+            logger.debug("Executing SELECT available FROM books WHERE id = %s", book_id)
+            c.execute("SELECT available FROM books WHERE id = ?", (book_id,))
+            result = c.fetchone()
+            logger.debug("Availability result: %s", result)
+            if not result or result[0] <= 0:
+                logger.info("Book %s not available to borrow", book_id)
+                return False, "Book is not available for borrowing"
+            due_date = (datetime.now() + timedelta(days=14)).strftime("%Y-%m-%d %H:%M:%S")
+            logger.debug("Inserting borrowing record for user %s book %s", username, book_id)
+            c.execute("""
+            INSERT INTO borrowings (book_id, username, borrow_date, due_date)
+            VALUES (?, ?, ?, ?)
+            """, (book_id, username, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), due_date))
+            logger.debug("Decrementing available count for book %s", book_id)
+            c.execute("UPDATE books SET available = available - 1 WHERE id = ?", (book_id,))
+            if RECOMMENDER_ENGINE == "cooccurrence":
+                cooccurrence.record_borrow(conn, username, book_id)
+            logger.info("Borrowed book ID %s for user %s", book_id, username)
+            return True, "Book borrowed successfully"
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                logger.debug("Executing SELECT available FROM books WHERE id = %s", book_id)
-                c.execute("SELECT available FROM books WHERE id = ?", (book_id,))
-                result = c.fetchone()
-                logger.debug("Availability result: %s", result)
-                if not result or result[0] <= 0:
-                    logger.info("Book %s not available to borrow", book_id)
-                    return False, "Book is not available for borrowing"
-                due_date = (datetime.now() + timedelta(days=14)).strftime("%Y-%m-%d %H:%M:%S")
-                logger.debug("Inserting borrowing record for user %s book %s", username, book_id)
-                c.execute("""
-                INSERT INTO borrowings (book_id, username, borrow_date, due_date)
-                VALUES (?, ?, ?, ?)
-                """, (book_id, username, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), due_date))
-                logger.debug("Decrementing available count for book %s", book_id)
-                c.execute("UPDATE books SET available = available - 1 WHERE id = ?", (book_id,))
-                conn.commit()
-                logger.info("Borrowed book ID %s for user %s", book_id, username)
-                return True, "Book borrowed successfully"
+            return write(_borrow, self.db_name)
         except sqlite3.Error as e:
             logger.exception("Error borrowing book: %s", e)
             return False, f"Database error: {e}"
 
     def return_book(self, borrowing_id):
         logger.debug("return_book called with borrowing_id=%s", borrowing_id)
+        def _return(conn):
+            c = conn.cursor()
+            logger.debug("Selecting borrowing row for id %s", borrowing_id)
+            c.execute("SELECT book_id, return_date, due_date FROM borrowings WHERE id = ?", (borrowing_id,))
+            result = c.fetchone()
+            logger.debug("Borrowing row: %s", result)
+            if not result:
+                logger.info("Borrowing ID %s not found", borrowing_id)
+                return False, "Borrowing record not found"
+            if result[1] is not None:
+                logger.info("Borrowing ID %s already returned", borrowing_id)
+                return False, "Book already returned"
+            book_id, _, due_date = result
+            return_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            fine = self.calculate_fine(due_date, return_date)
+            logger.debug("Updating borrowings return_date and fine for id %s", borrowing_id)
+            c.execute("UPDATE borrowings SET return_date = ?, fine = ? WHERE id = ?", (return_date, fine, borrowing_id))
+            logger.debug("Incrementing available for book %s", book_id)
+            c.execute("UPDATE books SET available = available + 1 WHERE id = ?", (book_id,))
+            logger.info("Returned book ID %s for borrowing ID %s with fine Rs. %s", book_id, borrowing_id, fine)
+            return True, f"Book returned successfully{f'. Fine: Rs. {fine}' if fine > 0 else ''}"
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                logger.debug("Selecting borrowing row for id %s", borrowing_id)
-                c.execute("SELECT book_id, return_date, due_date FROM borrowings WHERE id = ?", (borrowing_id,))
-                result = c.fetchone()
-                logger.debug("Borrowing row: %s", result)
-                if not result:
-                    logger.info("Borrowing ID %s not found", borrowing_id)
-                    return False, "Borrowing record not found"
-                if result[1] is not None:
-                    logger.info("Borrowing ID %s already returned", borrowing_id)
-                    return False, "Book already returned"
-                book_id, _, due_date = result
-                return_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                fine = self.calculate_fine(due_date, return_date)
-                logger.debug("Updating borrowings return_date and fine for id %s", borrowing_id)
-                c.execute("UPDATE borrowings SET return_date = ?, fine = ? WHERE id = ?", (return_date, fine, borrowing_id))
-                logger.debug("Incrementing available for book %s", book_id)
-                c.execute("UPDATE books SET available = available + 1 WHERE id = ?", (book_id,))
-                conn.commit()
-                logger.info("Returned book ID %s for borrowing ID %s with fine Rs. %s", book_id, borrowing_id, fine)
-                return True, f"Book returned successfully{f'. Fine: Rs. {fine}' if fine > 0 else ''}"
+            return write(_return, self.db_name)
         except sqlite3.Error as e:
             logger.exception("Error returning book: %s", e)
             return False, f"Database error: {e}"
 
     def get_user_borrowings(self, username):
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with get_connection(self.db_name) as conn:
                 c = conn.cursor()
                 c.execute("""
                 SELECT b.id, bk.title, bk.author, b.borrow_date, b.due_date, b.return_date, b.fine
@@ -142,7 +141,7 @@ class BorrowReturnSystem:
 
     def get_unreturned_borrowings(self, username):
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with get_connection(self.db_name) as conn:
                 c = conn.cursor()
                 c.execute("""
                 SELECT b.id, bk.title, bk.author, b.borrow_date, b.due_date
@@ -160,7 +159,7 @@ class BorrowReturnSystem:
 
     def get_available_books(self):
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with get_connection(self.db_name) as conn:
                 c = conn.cursor()
                 c.execute("SELECT id, title, author, available FROM books WHERE available > 0 ORDER BY title")
                 rows = c.fetchall()
@@ -170,85 +169,104 @@ class BorrowReturnSystem:
             print(f"Error fetching available books: {e}")
             return []
 
+    def count_available_books(self):
+        try:
+            with get_connection(self.db_name) as conn:
+                return conn.execute("SELECT COUNT(*) FROM books WHERE available > 0").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error counting available books: {e}")
+            return 0
+
+    def get_available_books_page(self, cursor=None, page_size=pagination.PAGE_SIZE, offset=0):
+        """One page of available books ordered by (title, id); see pagination.py."""
+        try:
+            with get_connection(self.db_name) as conn:
+                return pagination.available_books(conn, cursor, page_size, offset)
+        except sqlite3.Error as e:
+            print(f"Error fetching available books: {e}")
+            return pagination.Page([], None)
+
+    def count_user_borrowings(self, username):
+        try:
+            with get_connection(self.db_name) as conn:
+                return pagination.count_user_borrowings(conn, username)
+        except sqlite3.Error as e:
+            print(f"Error counting borrowings: {e}")
+            return 0
+
+    def get_user_borrowings_page(self, username, cursor=None, page_size=pagination.PAGE_SIZE, offset=0):
+        """One page of a user's borrowings, newest first, ordered by (borrow_date, id)."""
+        try:
+            with get_connection(self.db_name) as conn:
+                return pagination.user_borrowings(conn, username, cursor, page_size, offset)
+        except sqlite3.Error as e:
+            print(f"Error fetching borrowings: {e}")
+            return pagination.Page([], None)
+
     def get_recommended_books(self, username, top_n=5):
+        # Errors propagate: RecommendationsGUI runs this on a worker and reports them
+        with get_connection(self.db_name) as conn:
+            c = conn.cursor()
+            if RECOMMENDER_ENGINE == "cooccurrence":
+                rec_books = cooccurrence.recommend(conn, username, top_n)
+            else:
+                rec_books = self._svd_recommendations(conn, username, top_n)
+            if not rec_books:
+                # Fallback to popular books
+                c.execute("""
+                SELECT book_id, COUNT(*) as borrows
+                FROM borrowings
+                GROUP BY book_id
+                ORDER BY borrows DESC
+                LIMIT ?
+                """, (top_n,))
+                rec_books = [row[0] for row in c.fetchall()]
+            # Get book details
+            if rec_books:
+                placeholders = ','.join('?' for _ in rec_books)
+                c.execute(f"SELECT id, title, author FROM books WHERE id IN ({placeholders})", rec_books)
+                details = {row[0]: row for row in c.fetchall()}
+                # Keep the ranking order
+                return [details[book_id] for book_id in rec_books if book_id in details]
+            else:
+                return []
+
+    def get_also_borrowed(self, book_id, limit=5):
+        if RECOMMENDER_ENGINE != "cooccurrence":
+            return []   # the neighbour tables are not kept up to date
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                c = conn.cursor()
-                # Get all unique users and books
-                c.execute("SELECT DISTINCT username FROM users")
-                users = [row[0] for row in c.fetchall()]
-                c.execute("SELECT DISTINCT id FROM books")
-                books = [row[0] for row in c.fetchall()]
-                if not users or not books:
-                    return []
-                user_map = {u: i for i, u in enumerate(users)}
-                book_map = {b: i for i, b in enumerate(books)}
-                # Get interactions (binary: 1 if borrowed)
-                c.execute("SELECT DISTINCT username, book_id, 1 as interaction FROM borrowings")
-                data = c.fetchall()
-                if not data:
-                    # Fallback to popular books
-                    c.execute("""
-                    SELECT book_id, COUNT(*) as borrows
-                    FROM borrowings
-                    GROUP BY book_id
-                    ORDER BY borrows DESC
-                    LIMIT ?
-                    """, (top_n,))
-                    pop = c.fetchall()
-                    recs = [row[0] for row in pop]
-                    if recs:
-                        c.execute("SELECT id, title, author FROM books WHERE id IN ({})".format(','.join('?' for _ in recs)), recs)
-                        return c.fetchall()
-                    else:
-                        return []
-                # Build sparse matrix (FIX: Use float64 dtype for SVD compatibility)
-                rows = []
-                cols = []
-                vals = []
-                for u, b, inter in data:
-                    if u in user_map and b in book_map:
-                        rows.append(user_map[u])
-                        cols.append(book_map[b])
-                        vals.append(inter)
-                matrix = csr_matrix((vals, (rows, cols)), shape=(len(users), len(books)), dtype=np.float64)
-                # SVD decomposition
-                k = min(50, min(matrix.shape[0], matrix.shape[1]) - 1)
-                U, sigma, Vt = svds(matrix, k=k)
-                sigma_diag = np.diag(sigma)
-                predicted = np.dot(np.dot(U, sigma_diag), Vt)
-                user_idx = user_map.get(username)
-                if user_idx is None:
-                    return []
-                user_preds = predicted[user_idx, :]
-                # Get books already borrowed
-                c.execute("SELECT DISTINCT book_id FROM borrowings WHERE username = ?", (username,))
-                borrowed = set(row[0] for row in c.fetchall())
-                # Get top recommendations
-                rec_indices = np.argsort(user_preds)[::-1]
-                rec_books = []
-                for idx in rec_indices:
-                    book_id = books[idx]
-                    if book_id not in borrowed:
-                        rec_books.append(book_id)
-                    if len(rec_books) == top_n:
-                        break
-                # Get book details
-                if rec_books:
-                    placeholders = ','.join('?' for _ in rec_books)
-                    c.execute(f"SELECT id, title, author FROM books WHERE id IN ({placeholders})", rec_books)
-                    return c.fetchall()
-                else:
-                    return []
-        except Exception as e:
-            print(f"Error in recommendations: {e}")
+            with get_connection(self.db_name) as conn:
+                return cooccurrence.also_borrowed(conn, book_id, limit)
+        except sqlite3.Error as e:
+            print(f"Error fetching related books: {e}")
             return []
 
+    def _svd_recommendations(self, conn, username, top_n):
+        # Precomputed by recommend_batch.py; model_version is the last borrowing the
+        # batch saw, so a member who has borrowed since gets a live score instead
+        precomputed = [row[0] for row in conn.execute("""
+        SELECT r.book_id
+        FROM recommendations r JOIN books bk ON bk.id = r.book_id
+        WHERE r.username = ?
+          AND NOT EXISTS (SELECT 1 FROM borrowings b WHERE b.username = r.username AND b.book_id = r.book_id)
+          AND NOT EXISTS (SELECT 1 FROM borrowings b WHERE b.username = r.username AND b.id > r.model_version)
+        ORDER BY r.rank
+        LIMIT ?
+        """, (username, top_n))]
+        if precomputed:
+            return precomputed
+        # numpy/scipy/pandas are only imported here, not at startup
+        recommender = startup.load_recommender()
+        model = recommender.get_model(conn, self.db_name)
+        return recommender.recommend(conn, model, username, top_n) if model is not None else []
+
 class BorrowGUI:
     def __init__(self, root, username):
         self.root = root
         self.username = username
         self.borrow_system = BorrowReturnSystem()
+        # Built from get_available_books() on first use, dropped when a borrow changes availability
+        self.search_index = None
         self.setup_gui()
 
     def setup_gui(self):
@@ -282,12 +300,18 @@ class BorrowGUI:
         # Tree view placed above a bottom control bar so action buttons remain visible
         self.tree.pack(fill="both", expand=True)
 
-        scrollbar = ttk.Scrollbar(main_container, orient="vertical", command=self.tree.yview)
+        scrollbar = ttk.Scrollbar(main_container, orient="vertical")
         scrollbar.pack(side="right", fill="y")
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Only the visible rows are materialized; further pages are fetched on scroll
+        self.book_list = VirtualTreeview(self.tree, scrollbar)
         # Bindings for selection and double-click to borrow
         self.tree.bind("<Double-1>", lambda e: self.borrow_selected_book())
-        self.tree.bind("<<TreeviewSelect>>", lambda e: logger.debug("Tree selection changed: %s", self.tree.selection()))
+        self.tree.bind("<<TreeviewSelect>>", self.on_select, add="+")
+
+        # "Readers who borrowed this also borrowed", for the selected book
+        self.also_label = tk.Label(main_container, text="", font=("Segoe UI", 10), bg="#f0f2f5", fg="#495057",
+                                   anchor="w", justify="left", wraplength=900)
+        self.also_label.pack(side="bottom", fill="x", pady=(10, 0), before=self.tree)
 
         # Bottom control bar: pack BEFORE the main_container so it reserves space at bottom
         control_bar = tk.Frame(self.root, bg="#f0f2f5", padx=10, pady=8)
@@ -328,35 +352,49 @@ class BorrowGUI:
 
         self.load_available_books()
 
+    def get_search_index(self):
+        if self.search_index is None:
+            self.search_index = BookSearchIndex(self.borrow_system.get_available_books(), fields=(1, 2))
+        return self.search_index
+
     def load_available_books(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        books = self.borrow_system.get_available_books()
-        logger.debug("load_available_books: %d books to show", len(books))
-        for book in books:
-            self.tree.insert("", "end", values=book)
+        if self.search_var.get().strip():
+            self.on_search_change()
+            return
+        # Unfiltered list: page straight out of SQLite instead of loading every title
+        source = pagination.KeysetSource(self.borrow_system.get_available_books_page)
+        self.book_list.set_source(self.borrow_system.count_available_books, source.fetch)
+        logger.debug("load_available_books: %d books available", self.book_list.total)
 
     def on_search_change(self, *args):
-        query = self.search_var.get().lower()
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        books = self.borrow_system.get_available_books()
-        for book in books:
-            if query in book[1].lower() or query in book[2].lower():
-                self.tree.insert("", "end", values=book)
+        if not self.search_var.get().strip():
+            self.load_available_books()
+            return
+        self.book_list.set_rows(self.get_search_index().search(self.search_var.get()))
+
+    def on_select(self, event=None):
+        logger.debug("Tree selection changed: %s", self.tree.selection())
+        selected = self.book_list.selected_values()
+        related = self.borrow_system.get_also_borrowed(selected[0]) if selected else []
+        if related:
+            titles = ", ".join(f"{title} ({author})" for _, title, author in related)
+            self.also_label.config(text=f"Readers who borrowed this also borrowed: {titles}")
+        else:
+            self.also_label.config(text="")
 
     def borrow_selected_book(self):
-        selected = self.tree.selection()
+        selected = self.book_list.selected_values()
         logger.debug("borrow_selected_book selection: %s", selected)
         if not selected:
             messagebox.showwarning("Warning", "Please select a book to borrow")
             return
-        book_id = self.tree.item(selected[0])["values"][0]
+        book_id = selected[0]
         logger.debug("User %s attempting to borrow book id %s", self.username, book_id)
         success, message = self.borrow_system.borrow_book(book_id, self.username)
         logger.debug("borrow_book result: success=%s message=%s", success, message)
         if success:
             messagebox.showinfo("Success", message)
+            self.search_index = None
             self.load_available_books()
         else:
             messagebox.showerror("Error", message)
@@ -434,18 +472,11 @@ class ReturnGUI:
             return
         borrowing_id = self.tree.item(selected[0])["values"][0]
         logger.debug("User %s attempting to return borrowing id %s", self.username, borrowing_id)
-        # Pre-check: fetch due_date and calculate potential fine to confirm with user
+        # Pre-check: the fine that would be due if returned now, to confirm with user
         fine = 0
         try:
-            with sqlite3.connect(self.borrow_system.db_name) as conn:
-                c = conn.cursor()
-                c.execute("SELECT due_date FROM borrowings WHERE id = ?", (borrowing_id,))
-                row = c.fetchone()
-                if row and row[0]:
-                    due_date = row[0]
-                    fine = self.borrow_system.calculate_fine(due_date)
-                else:
-                    fine = 0
+            with get_connection(self.borrow_system.db_name) as conn:
+                fine = fines.current_fine(conn, borrowing_id)
         except sqlite3.Error as e:
             logger.exception("Error fetching due_date for borrowing id %s: %s", borrowing_id, e)
             messagebox.showerror("Error", "Unable to verify due date. Please try again.")
@@ -498,9 +529,9 @@ class HistoryGUI:
         self.tree.column("Fine", width=100)
         self.tree.pack(fill="both", expand=True)
 
-        scrollbar = ttk.Scrollbar(main_container, orient="vertical", command=self.tree.yview)
+        scrollbar = ttk.Scrollbar(main_container, orient="vertical")
         scrollbar.pack(side="right", fill="y")
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.history_list = VirtualTreeview(self.tree, scrollbar)
 
         tk.Button(main_container, text="Back", command=self.root.destroy, font=("Segoe UI", 12, "bold"), bg="#6c757d", fg="white", relief="flat", cursor="hand2", padx=20, pady=10).pack(pady=10)
 
@@ -508,19 +539,23 @@ class HistoryGUI:
 
     def load_history(self):
         self.borrow_system.update_fines()  # Update fines before displaying
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        borrowings = self.borrow_system.get_user_borrowings(self.username)
-        for b in borrowings:
-            return_date = b[5] if b[5] else "Not returned"
-            fine = b[6]
-            self.tree.insert("", "end", values=(b[1], b[2], b[3], b[4], return_date, fine))
+
+        source = pagination.KeysetSource(
+            lambda **page: self.borrow_system.get_user_borrowings_page(self.username, **page))
+
+        def fetch(offset, limit):
+            return [(key, (b[1], b[2], b[3], b[4], b[5] if b[5] else "Not returned", b[6]))
+                    for key, b in source.fetch(offset, limit)]
+
+        self.history_list.set_source(lambda: self.borrow_system.count_user_borrowings(self.username), fetch)
 
 class RecommendationsGUI:
     def __init__(self, root, username):
         self.root = root
         self.username = username
         self.borrow_system = BorrowReturnSystem()
+        # Recommendations are computed on a worker thread; this is the pending task, if any
+        self.task = None
         self.setup_gui()
 
     def setup_gui(self):
@@ -550,10 +585,11 @@ class RecommendationsGUI:
         control_bar = tk.Frame(self.root, bg="#f0f2f5", padx=10, pady=8)
         control_bar.pack(side="bottom", fill="x")
 
-        help_lbl = tk.Label(control_bar, text="Select a recommended book and click 'Borrow Selected'", font=("Segoe UI", 10), bg="#f0f2f5", fg="#495057")
-        help_lbl.pack(side="left")
+        self.help_lbl = tk.Label(control_bar, text="", font=("Segoe UI", 10), bg="#f0f2f5", fg="#495057")
+        self.help_lbl.pack(side="left")
+        self.progress = ttk.Progressbar(control_bar, mode="indeterminate", length=160)
 
-        borrow_btn = tk.Button(control_bar, text="Borrow Selected", command=self.borrow_selected, font=("Segoe UI", 12, "bold"), bg="#4a9eff", fg="white", relief="flat", cursor="hand2", padx=16, pady=8)
+        self.borrow_btn = borrow_btn = tk.Button(control_bar, text="Borrow Selected", command=self.borrow_selected, font=("Segoe UI", 12, "bold"), bg="#4a9eff", fg="white", relief="flat", cursor="hand2", padx=16, pady=8)
         borrow_btn.pack(side="right", padx=6)
         back_btn = tk.Button(control_bar, text="Back", command=self.root.destroy, font=("Segoe UI", 12, "bold"), bg="#6c757d", fg="white", relief="flat", cursor="hand2", padx=16, pady=8)
         back_btn.pack(side="right", padx=6)
@@ -567,16 +603,44 @@ class RecommendationsGUI:
         self.load_recommendations()
 
     def load_recommendations(self):
+        if self.task is not None:
+            self.task.cancel()
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        # Placeholder while the worker computes; the window stays responsive meanwhile
+        self.tree.insert("", "end", iid="loading", values=("", "Finding books you might like...", ""))
+        self.help_lbl.config(text="Loading recommendations...")
+        self.progress.pack(side="left", padx=10)
+        self.progress.start(15)
+        self.borrow_btn.config(state="disabled")
+        self.task = background.run(self.root, self.borrow_system.get_recommended_books, self.username,
+                                   on_done=self.show_recommendations, on_error=self.show_error)
+
+    def _loading_done(self):
+        self.task = None
+        self.progress.stop()
+        self.progress.pack_forget()
+        self.borrow_btn.config(state="normal")
+        self.help_lbl.config(text="Select a recommended book and click 'Borrow Selected'")
         for item in self.tree.get_children():
             self.tree.delete(item)
-        recs = self.borrow_system.get_recommended_books(self.username)
+
+    def show_recommendations(self, recs):
+        self._loading_done()
         logger.debug("load_recommendations returned %d recommendations for %s", len(recs), self.username)
         for rec in recs:
             self.tree.insert("", "end", values=rec)
         if not recs:
             messagebox.showinfo("Info", "No recommendations available yet. Borrow some books to get personalized suggestions!")
 
+    def show_error(self, error):
+        self._loading_done()
+        logger.error("Loading recommendations failed: %s", error)
+        messagebox.showerror("Error", f"Could not load recommendations: {error}")
+
     def borrow_selected(self):
+        if self.task is not None:
+            return
         selected = self.tree.selection()
         if not selected:
             messagebox.showwarning("Warning", "Please select a book to borrow")
@@ -584,7 +648,7 @@ class RecommendationsGUI:
         book_id = self.tree.item(selected[0])["values"][0]
         logger.debug("Recommendations borrow_selected chosen book_id=%s for user=%s", book_id, self.username)
         # Check availability
-        with sqlite3.connect(DB_NAME) as conn:
+        with get_connection() as conn:
             c = conn.cursor()
             c.execute("SELECT available FROM books WHERE id = ?", (book_id,))
             result = c.fetchone()
@@ -0,0 +1,68 @@
+"""
+FTS5 full-text search over the book catalog.
+
+books_fts is an external-content FTS5 table over books(title, author, isbn,
+genre), created with the triggers that keep it in sync with books by
+migration 3 (_catalog_fts in migrations.py). Searches are ranked with bm25
+(title matches weigh most, then author, isbn, genre) and every query term
+is a prefix match, so "harp lee" finds "Harper Lee".
+
+If the SQLite build has no FTS5 the index is simply not created and
+search_books() falls back to the old LIKE scan.
+"""
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+BOOK_COLUMNS = "id, title, author, isbn, genre, publication_year, quantity, available, date_added"
+# Matches shown by the search-as-you-type boxes; typing more narrows the rest down
+RESULT_LIMIT = 200
+
+
+def has_index(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'").fetchone() is not None
+
+
+def rebuild(conn):
+    conn.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+
+
+def to_match_query(text):
+    """Turn free text typed by a user into an FTS5 prefix query, or None if it has no terms."""
+    text = text.strip()
+    # ISBNs are often typed with hyphens but stored without
+    if re.fullmatch(r"[\d\-\s]+[\dXx]?", text):
+        text = re.sub(r"[\-\s]", "", text)
+    terms = re.findall(r"\w+", text)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_books(conn, query, columns=BOOK_COLUMNS, limit=-1):
+    """Return books matching query, best match first.
+
+    columns is a comma-separated list of books columns to return.
+    """
+    match = to_match_query(query)
+    if match is None:
+        return []
+    select = ", ".join(f"b.{col.strip()}" for col in columns.split(","))
+    if has_index(conn):
+        return conn.execute(f"""
+        SELECT {select}
+        FROM books_fts
+        JOIN books b ON b.id = books_fts.rowid
+        WHERE books_fts MATCH ?
+        ORDER BY books_fts.rank, b.title
+        LIMIT ?
+        """, (match, limit)).fetchall()
+    like = f"%{query.strip().lower()}%"
+    return conn.execute(f"""
+    SELECT {select}
+    FROM books b
+    WHERE LOWER(b.title) LIKE ? OR LOWER(b.author) LIKE ? OR LOWER(b.isbn) LIKE ? OR LOWER(b.genre) LIKE ?
+    ORDER BY b.title
+    LIMIT ?
+    """, (like, like, like, like, limit)).fetchall()
@@ -0,0 +1,161 @@
+"""
+Item-item co-occurrence recommender.
+
+Two books co-occur when the same member has borrowed both. The counts live
+in book_cooccurrence (stored in both directions), the number of distinct
+readers per book in book_readers, and for each book the TOP_K most similar
+books by cosine similarity,
+
+    count(a, b) / sqrt(readers(a) * readers(b)),
+
+are kept in book_neighbors (tables created empty by migration 7,
+_cooccurrence_tables in migrations.py). They are only maintained while
+borrow_return.RECOMMENDER_ENGINE is "cooccurrence". record_borrow() updates
+the counts inside the borrow transaction and refreshes the borrowed book's
+neighbour list; forget_user() and forget_book() take deleted members and
+books back out. The lists of other books drift slightly as counts change
+and are brought back in line by rebuild(), run by the nightly batch job
+(recommend_batch.py --cooccurrence) or directly:
+
+    python cooccurrence.py
+
+A member's recommendations are the neighbours of the books they have
+borrowed, summed by similarity; also_borrowed() is the "readers who
+borrowed this also borrowed" list of one book. Both are single indexed
+queries.
+"""
+import time
+
+from db import write
+from db_init import DB_NAME, init_db
+
+# Neighbours kept per book
+TOP_K = 20
+
+_SIMILARITY = """
+    SELECT co.book_a, co.book_b, co.count / sqrt(ra.readers * rb.readers) AS score
+    FROM book_cooccurrence co
+    JOIN book_readers ra ON ra.book_id = co.book_a
+    JOIN book_readers rb ON rb.book_id = co.book_b
+"""
+
+
+def rebuild(conn):
+    """Recompute counts and neighbour lists from the borrowings table."""
+    conn.execute("DELETE FROM book_readers")
+    conn.execute("""
+    INSERT INTO book_readers (book_id, readers)
+    SELECT book_id, COUNT(DISTINCT username) FROM borrowings
+    WHERE book_id IN (SELECT id FROM books) GROUP BY book_id
+    """)
+    conn.execute("DELETE FROM book_cooccurrence")
+    conn.execute("""
+    WITH pairs AS (SELECT DISTINCT username, book_id FROM borrowings WHERE book_id IN (SELECT id FROM books))
+    INSERT INTO book_cooccurrence (book_a, book_b, count)
+    SELECT a.book_id, b.book_id, COUNT(*)
+    FROM pairs a JOIN pairs b ON a.username = b.username AND a.book_id <> b.book_id
+    GROUP BY a.book_id, b.book_id
+    """)
+    conn.execute("DELETE FROM book_neighbors")
+    conn.execute(f"""
+    INSERT INTO book_neighbors (book_id, rank, neighbor_id, score)
+    SELECT book_a, rank, book_b, score FROM (
+        SELECT book_a, book_b, score,
+               ROW_NUMBER() OVER (PARTITION BY book_a ORDER BY score DESC, book_b) AS rank
+        FROM ({_SIMILARITY})
+    ) WHERE rank <= ?
+    """, (TOP_K,))
+
+
+def refresh_neighbors(conn, book_id):
+    conn.execute("DELETE FROM book_neighbors WHERE book_id = ?", (book_id,))
+    conn.execute(f"""
+    INSERT INTO book_neighbors (book_id, rank, neighbor_id, score)
+    SELECT book_a, ROW_NUMBER() OVER (ORDER BY score DESC, book_b), book_b, score
+    FROM ({_SIMILARITY} WHERE co.book_a = ?)
+    ORDER BY score DESC, book_b
+    LIMIT ?
+    """, (book_id, TOP_K))
+
+
+def record_borrow(conn, username, book_id):
+    """Fold one new borrowing into the co-occurrence tables (call inside the borrow transaction)."""
+    earlier = conn.execute("SELECT COUNT(*) FROM borrowings WHERE username = ? AND book_id = ?",
+                           (username, book_id)).fetchone()[0]
+    if earlier > 1:
+        return   # already a reader of this book; nothing co-occurs anew
+    conn.execute("""
+    INSERT INTO book_readers (book_id, readers) VALUES (?, 1)
+    ON CONFLICT(book_id) DO UPDATE SET readers = readers + 1
+    """, (book_id,))
+    others = [row[0] for row in conn.execute("""
+    SELECT DISTINCT book_id FROM borrowings
+    WHERE username = ? AND book_id <> ? AND book_id IN (SELECT id FROM books)
+    """, (username, book_id))]
+    conn.executemany("""
+    INSERT INTO book_cooccurrence (book_a, book_b, count) VALUES (?, ?, 1)
+    ON CONFLICT(book_a, book_b) DO UPDATE SET count = count + 1
+    """, [(book_id, other) for other in others] + [(other, book_id) for other in others])
+    refresh_neighbors(conn, book_id)
+
+
+def forget_user(conn, username):
+    """Take a member's borrowings out of the counts (call before deleting them, in the same transaction)."""
+    books = [row[0] for row in conn.execute(
+        "SELECT DISTINCT book_id FROM borrowings WHERE username = ? AND book_id IS NOT NULL", (username,))]
+    if not books:
+        return
+    mine = "SELECT DISTINCT book_id FROM borrowings WHERE username = ?"
+    conn.execute(f"UPDATE book_readers SET readers = readers - 1 WHERE book_id IN ({mine})", (username,))
+    conn.execute("DELETE FROM book_readers WHERE readers <= 0")
+    conn.execute(f"""
+    UPDATE book_cooccurrence SET count = count - 1
+    WHERE book_a IN ({mine}) AND book_b IN ({mine})
+    """, (username, username))
+    conn.execute("DELETE FROM book_cooccurrence WHERE count <= 0")
+    for book_id in books:
+        refresh_neighbors(conn, book_id)
+
+
+def forget_book(conn, book_id):
+    """Drop a deleted book from the counts and from every neighbour list it was on."""
+    listed_on = [row[0] for row in conn.execute(
+        "SELECT book_id FROM book_neighbors WHERE neighbor_id = ?", (book_id,))]
+    conn.execute("DELETE FROM book_readers WHERE book_id = ?", (book_id,))
+    conn.execute("DELETE FROM book_cooccurrence WHERE book_a = ? OR book_b = ?", (book_id, book_id))
+    conn.execute("DELETE FROM book_neighbors WHERE book_id = ?", (book_id,))
+    for other in listed_on:
+        refresh_neighbors(conn, other)
+
+
+def recommend(conn, username, top_n=5):
+    """Ids of the top_n books most similar to what username has borrowed, best first."""
+    rows = conn.execute("""
+    WITH mine AS (SELECT DISTINCT book_id FROM borrowings WHERE username = ?)
+    SELECT n.neighbor_id, SUM(n.score) AS score
+    FROM book_neighbors n
+    WHERE n.book_id IN mine
+      AND NOT EXISTS (SELECT 1 FROM borrowings b WHERE b.username = ? AND b.book_id = n.neighbor_id)
+    GROUP BY n.neighbor_id
+    ORDER BY score DESC, n.neighbor_id
+    LIMIT ?
+    """, (username, username, top_n)).fetchall()
+    return [row[0] for row in rows]
+
+
+def also_borrowed(conn, book_id, limit=5):
+    """(id, title, author) of the books most often borrowed by readers of book_id."""
+    return conn.execute("""
+    SELECT bk.id, bk.title, bk.author
+    FROM book_neighbors n JOIN books bk ON bk.id = n.neighbor_id
+    WHERE n.book_id = ?
+    ORDER BY n.rank
+    LIMIT ?
+    """, (book_id, limit)).fetchall()
+
+
+if __name__ == "__main__":
+    init_db()
+    started = time.perf_counter()
+    write(rebuild, DB_NAME)
+    print(f"Rebuilt co-occurrence tables in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,197 @@
+"""
+Shared SQLite connection management.
+
+Every module gets its connection from get_connection() instead of calling
+sqlite3.connect() itself. Connections are kept open per thread (one per
+database file) so the file handle, parsed schema, page cache and prepared
+statement cache survive between calls. Use them exactly like before:
+
+    with get_connection() as conn:
+        c = conn.cursor()
+        ...
+
+The `with` block commits or rolls back as usual but does not close the
+connection. close_all() closes everything and is registered with atexit.
+
+Writes go through write(fn), which runs fn(conn) inside one transaction on a
+single writer thread per database file. In "wal" storage mode readers never
+wait for that writer (and vice versa); busy/locked errors caused by other
+processes using the same file are retried with backoff.
+"""
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from db_init import DB_NAME
+
+logger = logging.getLogger(__name__)
+
+# Number of prepared statements kept per connection (sqlite3 default is 128)
+STATEMENT_CACHE_SIZE = 256
+
+# Applied to every new connection
+PRAGMAS = {
+    "cache_size": -16000,   # ~16 MB page cache per connection
+    "temp_store": "MEMORY",
+    "mmap_size": 64 * 1024 * 1024,
+}
+
+# "wal": write-ahead log, concurrent readers, all writes on one writer thread.
+# "rollback": SQLite's default journal, writes run on the calling thread.
+STORAGE_MODE = "wal"
+
+# How long SQLite itself waits on a lock held by another connection/process
+BUSY_TIMEOUT_MS = 5000
+# Extra attempts (with backoff) when a write still fails with "database is locked"
+WRITE_RETRIES = 5
+RETRY_BACKOFF_SECONDS = 0.05
+
+_local = threading.local()
+_all_connections = []
+_registry_lock = threading.Lock()
+# Bumped by close_all() so every thread drops its (now closed) connections
+_generation = 0
+
+
+def _open(db_name):
+    conn = sqlite3.connect(db_name, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    if STORAGE_MODE == "wal":
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+    logger.debug("Opened connection to %s on thread %s", db_name, threading.current_thread().name)
+    return conn
+
+
+def get_connection(db_name=DB_NAME):
+    """Return this thread's persistent connection to db_name, opening it on first use."""
+    connections = getattr(_local, "connections", None)
+    if connections is None or _local.generation != _generation:
+        connections = _local.connections = {}
+        _local.generation = _generation
+    conn = connections.get(db_name)
+    if conn is None:
+        conn = _open(db_name)
+        connections[db_name] = conn
+        with _registry_lock:
+            _all_connections.append(conn)
+    return conn
+
+
+def _is_busy(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def _run_transaction(conn, fn):
+    for attempt in range(WRITE_RETRIES + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or attempt == WRITE_RETRIES:
+                raise
+            logger.debug("Write lock busy (attempt %d): %s", attempt + 1, e)
+            time.sleep(RETRY_BACKOFF_SECONDS * (2 ** attempt))
+            continue
+        try:
+            result = fn(conn)
+            conn.commit()
+            return result
+        except sqlite3.OperationalError as e:
+            conn.rollback()
+            if not _is_busy(e) or attempt == WRITE_RETRIES:
+                raise
+            logger.debug("Write busy inside transaction (attempt %d): %s", attempt + 1, e)
+            time.sleep(RETRY_BACKOFF_SECONDS * (2 ** attempt))
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+class _Writer(threading.Thread):
+    """Owns the only writing connection for one database file and runs queued writes in order."""
+
+    def __init__(self, db_name):
+        super().__init__(name=f"db-writer-{db_name}", daemon=True)
+        self.db_name = db_name
+        self.queue = queue.Queue()
+
+    def run(self):
+        conn = get_connection(self.db_name)
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            fn, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(_run_transaction(conn, fn))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def submit(self, fn):
+        future = Future()
+        self.queue.put((fn, future))
+        return future
+
+    def stop(self):
+        self.queue.put(None)
+        self.join(timeout=5)
+
+
+_writers = {}
+
+
+def _get_writer(db_name):
+    with _registry_lock:
+        writer = _writers.get(db_name)
+        if writer is None:
+            writer = _writers[db_name] = _Writer(db_name)
+            writer.start()
+        return writer
+
+
+def write(fn, db_name=DB_NAME):
+    """Run fn(conn) in a single write transaction and return its result.
+
+    Exceptions raised by fn roll the transaction back and are re-raised here.
+    """
+    if STORAGE_MODE != "wal":
+        return _run_transaction(get_connection(db_name), fn)
+    writer = _get_writer(db_name)
+    if threading.current_thread() is writer:
+        # Nested write from inside a queued write: already in its transaction
+        return fn(get_connection(db_name))
+    return writer.submit(fn).result()
+
+
+def close_all():
+    """Stop the writer threads and close every connection opened through this module.
+
+    Safe to call more than once.
+    """
+    global _generation
+    with _registry_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.stop()
+    with _registry_lock:
+        conns = list(_all_connections)
+        _all_connections.clear()
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning("Error closing connection: %s", e)
+    logger.debug("Closed %d database connection(s)", len(conns))
+
+
+atexit.register(close_all)
@@ -0,0 +1,256 @@
+"""
+Streaming export of the books, borrowings and fines reports.
+
+Rows are read with keyset pagination (EXPORT_PAGE_SIZE rows per query)
+and written as they arrive, to CSV or, when pyarrow is installed, to
+Parquet (one row group per page, dates as timestamps), so memory stays
+flat however many years of borrowings are exported. The borrowings and
+fines reports can be limited to loans taken between two dates (inclusive);
+the books report filters on date_added. Fines are the live values from the
+borrowing_fines view, so an export never has to refresh them first.
+
+The file is written next to its target as <path>.part and renamed into
+place at the end, so a failed or cancelled export leaves nothing behind.
+
+    python export_data.py borrowings borrowings.csv --since 2015-01-01
+    python export_data.py fines fines.parquet --until 2024-12-31
+"""
+import argparse
+import csv
+import importlib.util
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+import pagination
+from db import get_connection
+from db_init import DB_NAME, init_db
+
+# pyarrow is optional and slow to import, so it is only loaded for a Parquet export
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_PAGE_SIZE = 5000
+# Print progress every this many rows
+PROGRESS_EVERY = 100000
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+FORMATS = ("csv", "parquet")
+
+_LOANS = "borrowing_fines b LEFT JOIN books bk ON b.book_id = bk.id"
+_LOAN_COLUMNS = [
+    ("id", "b.id", "int"),
+    ("username", "b.username", "text"),
+    ("book_id", "b.book_id", "int"),
+    ("title", "bk.title", "text"),
+    ("isbn", "bk.isbn", "text"),
+    ("borrow_date", "b.borrow_date", "date"),
+    ("due_date", "b.due_date", "date"),
+    ("return_date", "b.return_date", "date"),
+    ("fine", "b.current_fine", "int"),
+]
+
+# name -> source, (column, expression, type) list, sort keys, date filter column, extra condition
+REPORTS = {
+    "books": {
+        "source": "books",
+        "columns": [
+            ("id", "id", "int"),
+            ("title", "title", "text"),
+            ("author", "author", "text"),
+            ("isbn", "isbn", "text"),
+            ("genre", "genre", "text"),
+            ("publication_year", "publication_year", "int"),
+            ("quantity", "quantity", "int"),
+            ("available", "available", "int"),
+            ("date_added", "date_added", "date"),
+        ],
+        "keys": ["id"],
+        "date_column": "date_added",
+        "where": "1",
+    },
+    "borrowings": {
+        "source": _LOANS,
+        "columns": _LOAN_COLUMNS,
+        "keys": ["b.borrow_date", "b.id"],
+        "date_column": "b.borrow_date",
+        "where": "1",
+    },
+    "fines": {
+        "source": _LOANS,
+        "columns": _LOAN_COLUMNS,
+        "keys": ["b.borrow_date", "b.id"],
+        "date_column": "b.borrow_date",
+        "where": "b.current_fine > 0",
+    },
+}
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def parse_date(value):
+    """A YYYY-MM-DD string as given, or ValueError."""
+    datetime.strptime(value, "%Y-%m-%d")
+    return value
+
+
+def report_filter(report, since=None, until=None):
+    """(where, params) for a report limited to since..until (inclusive days)."""
+    spec = REPORTS[report]
+    where = [spec["where"]]
+    params = []
+    if since:
+        where.append(f"{spec['date_column']} >= ?")
+        params.append(since)
+    if until:
+        where.append(f"{spec['date_column']} < date(?, '+1 day')")
+        params.append(until)
+    return " AND ".join(where), params
+
+
+def count_rows(conn, report, since=None, until=None):
+    where, params = report_filter(report, since, until)
+    return conn.execute(f"SELECT COUNT(*) FROM {REPORTS[report]['source']} WHERE {where}", params).fetchone()[0]
+
+
+def iter_report(conn, report, since=None, until=None, page_size=EXPORT_PAGE_SIZE):
+    """Yield the pages (lists of row tuples) of a report in key order."""
+    spec = REPORTS[report]
+    where, params = report_filter(report, since, until)
+    columns = ", ".join(expr for _, expr, _ in spec["columns"])
+    cursor = None
+    while True:
+        page = pagination.keyset_page(conn, columns, spec["source"], spec["keys"], where=where, params=params,
+                                      cursor=cursor, page_size=page_size)
+        if page.rows:
+            yield page.rows
+        cursor = page.next_cursor
+        if cursor is None:
+            return
+
+
+# -- writers -----------------------------------------------------------
+
+class CsvWriter:
+    def __init__(self, path, columns):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, _, _ in columns])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    TYPES = {"int": "int64", "text": "string", "date": "timestamp[s]"}
+
+    def __init__(self, path, columns):
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+
+        self.pa = pyarrow
+        self.columns = columns
+        self.schema = pyarrow.schema([(name, pyarrow.type_for_alias(self.TYPES[kind])) for name, _, kind in columns])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def _array(self, values, kind):
+        if kind == "date":
+            text = self.pa.array(values, type=self.pa.string())
+            return self.pa.compute.strptime(text, format=DATE_FORMAT, unit="s", error_is_null=True)
+        return self.pa.array(values, type=self.pa.type_for_alias(self.TYPES[kind]))
+
+    def write(self, rows):
+        arrays = [self._array(values, kind) for values, (_, _, kind) in zip(zip(*rows), self.columns)]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def open_writer(path, columns, fmt):
+    if fmt == "parquet":
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        return ParquetWriter(path, columns)
+    return CsvWriter(path, columns)
+
+
+def detect_format(path):
+    return "parquet" if path.lower().endswith((".parquet", ".pq")) else "csv"
+
+
+# -- driver ------------------------------------------------------------
+
+def export(report, path, db_name=DB_NAME, fmt=None, since=None, until=None, page_size=EXPORT_PAGE_SIZE,
+           progress=None, cancel=None):
+    """Write report to path. Returns a dict of counts and timing.
+
+    progress(rows, total, seconds) is called after every page; setting the
+    threading.Event cancel stops the export with ExportCancelled.
+    """
+    if report not in REPORTS:
+        raise ValueError(f"Unknown report {report!r}")
+    fmt = fmt or detect_format(path)
+    conn = get_connection(db_name)
+    total = count_rows(conn, report, since, until)
+    started = time.perf_counter()
+    rows = 0
+    part = path + ".part"
+    writer = open_writer(part, REPORTS[report]["columns"], fmt)
+    try:
+        for page in iter_report(conn, report, since, until, page_size):
+            if cancel is not None and cancel.is_set():
+                raise ExportCancelled(f"Export of {report} cancelled after {rows} rows")
+            writer.write(page)
+            rows += len(page)
+            if progress:
+                progress(rows, total, time.perf_counter() - started)
+        writer.close()
+        os.replace(part, path)
+    except BaseException:
+        writer.close()
+        os.remove(part)
+        raise
+    seconds = time.perf_counter() - started
+    logger.info("Exported %d %s rows to %s in %.1fs", rows, report, path, seconds)
+    return {"rows": rows, "seconds": seconds, "rows_per_second": rows / seconds if seconds else 0.0,
+            "path": path, "format": fmt}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a books, borrowings or fines report to CSV or Parquet.")
+    parser.add_argument("report", choices=sorted(REPORTS))
+    parser.add_argument("path", help="output file")
+    parser.add_argument("--format", choices=FORMATS, help="output format (default: from the file extension)")
+    parser.add_argument("--since", type=parse_date, help="first day to include, YYYY-MM-DD (loan or date added)")
+    parser.add_argument("--until", type=parse_date, help="last day to include, YYYY-MM-DD")
+    parser.add_argument("--page-size", type=int, default=EXPORT_PAGE_SIZE, help="rows per query")
+    args = parser.parse_args()
+    init_db()
+
+    next_report = [PROGRESS_EVERY]
+
+    def progress(rows, total, seconds):
+        if rows >= next_report[0] and rows < total:
+            print(f"  {rows}/{total} rows, {rows / seconds:.0f} rows/s", flush=True)
+            next_report[0] += PROGRESS_EVERY
+
+    try:
+        counts = export(args.report, args.path, fmt=args.format, since=args.since, until=args.until,
+                        page_size=args.page_size, progress=progress)
+    except (OSError, RuntimeError) as e:
+        print(f"Error exporting {args.report}: {e}")
+        sys.exit(1)
+    print(f"Exported {counts['rows']} {args.report} rows to {counts['path']} in {counts['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
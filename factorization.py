@@ -0,0 +1,140 @@
+"""
+Factorization backends for the recommendation model.
+
+factorize() returns U, sigma, Vt for the user x book matrix using the
+backend that suits its size:
+
+- "dense":      numpy SVD of the densified matrix; exact and fastest while
+                the matrix is small (branch databases).
+- "randomized": randomized SVD (range finder with power iterations); for
+                large, very sparse matrices where only sparse products are
+                affordable.
+- "svds":       scipy's ARPACK truncated SVD, for large matrices that are
+                not sparse enough for the randomized path to pay off.
+- "als":        implicit-feedback ALS (confidence 1 + ALPHA * r); never
+                picked automatically, ask for it with method="als".
+
+Every run records which method was used, why, and how long it took.
+
+fold_in_projector() / item_projector() give the least-squares fold-in for
+any of these: a new user's row is x @ P and a new book's column is a @ Q.
+For an SVD with no regularization this is the familiar x V / sigma.
+"""
+import logging
+import time
+from collections import namedtuple
+
+import numpy as np
+from scipy.sparse.linalg import svds
+
+logger = logging.getLogger(__name__)
+
+# Matrices with at most this many cells are factorized densely
+DENSE_MAX_CELLS = 4_000_000
+# Below this density (nnz / cells) large matrices use the randomized SVD
+RANDOMIZED_MAX_DENSITY = 0.01
+RANDOMIZED_OVERSAMPLES = 10
+RANDOMIZED_POWER_ITERATIONS = 4
+
+ALS_ALPHA = 40.0
+ALS_REGULARIZATION = 0.1
+ALS_ITERATIONS = 10
+
+Factorization = namedtuple("Factorization", "U sigma Vt method reason seconds regularization")
+
+
+def choose_method(shape, nnz):
+    """(method, reason) for a matrix of this shape and number of non-zeros."""
+    cells = shape[0] * shape[1]
+    density = nnz / cells if cells else 0.0
+    if cells <= DENSE_MAX_CELLS:
+        return "dense", f"{shape[0]}x{shape[1]} = {cells} cells <= {DENSE_MAX_CELLS}"
+    if density < RANDOMIZED_MAX_DENSITY:
+        return "randomized", f"{cells} cells, density {density:.2e} < {RANDOMIZED_MAX_DENSITY}"
+    return "svds", f"{cells} cells, density {density:.2e} >= {RANDOMIZED_MAX_DENSITY}"
+
+
+def factorize(matrix, k, method="auto", seed=0):
+    """Rank-k factorization of a scipy sparse matrix."""
+    if method == "auto":
+        method, reason = choose_method(matrix.shape, matrix.nnz)
+    else:
+        reason = "requested"
+    started = time.perf_counter()
+    regularization = 0.0
+    if method == "dense":
+        U, sigma, Vt = dense_svd(matrix, k)
+    elif method == "randomized":
+        U, sigma, Vt = randomized_svd(matrix, k, seed=seed)
+    elif method == "svds":
+        U, sigma, Vt = svds(matrix, k=k)
+    elif method == "als":
+        U, sigma, Vt = implicit_als(matrix, k, seed=seed)
+        regularization = ALS_REGULARIZATION
+    else:
+        raise ValueError(f"Unknown factorization method: {method!r}")
+    seconds = time.perf_counter() - started
+    logger.info("Factorized %dx%d matrix (nnz=%d, k=%d) with %s in %.3fs: %s",
+                matrix.shape[0], matrix.shape[1], matrix.nnz, k, method, seconds, reason)
+    return Factorization(U, sigma, Vt, method, reason, seconds, regularization)
+
+
+def dense_svd(matrix, k):
+    U, sigma, Vt = np.linalg.svd(matrix.toarray(), full_matrices=False)
+    return U[:, :k], sigma[:k], Vt[:k]
+
+
+def randomized_svd(matrix, k, seed=0):
+    """Halko-Martinsson-Tropp randomized SVD using only sparse matrix products."""
+    rng = np.random.default_rng(seed)
+    width = min(k + RANDOMIZED_OVERSAMPLES, min(matrix.shape))
+    Q, _ = np.linalg.qr(matrix @ rng.standard_normal((matrix.shape[1], width)))
+    for _ in range(RANDOMIZED_POWER_ITERATIONS):
+        Q, _ = np.linalg.qr(matrix.T @ Q)
+        Q, _ = np.linalg.qr(matrix @ Q)
+    B = (matrix.T @ Q).T
+    Ub, sigma, Vt = np.linalg.svd(B, full_matrices=False)
+    return (Q @ Ub)[:, :k], sigma[:k], Vt[:k]
+
+
+def implicit_als(matrix, k, seed=0):
+    """Implicit-feedback ALS (Hu, Koren and Volinsky). Returns X, ones(k), Y.T."""
+    rng = np.random.default_rng(seed)
+    csr = matrix.tocsr()
+    csc_t = matrix.T.tocsr()
+    X = rng.normal(scale=0.01, size=(matrix.shape[0], k))
+    Y = rng.normal(scale=0.01, size=(matrix.shape[1], k))
+    for _ in range(ALS_ITERATIONS):
+        X = _als_step(csr, Y, k)
+        Y = _als_step(csc_t, X, k)
+    return X, np.ones(k), Y.T
+
+
+def _als_step(rows, fixed, k):
+    """Solve every row's factors against the fixed side's factors."""
+    gram = fixed.T @ fixed
+    reg = ALS_REGULARIZATION * np.eye(k)
+    out = np.zeros((rows.shape[0], k))
+    for i in range(rows.shape[0]):
+        start, stop = rows.indptr[i], rows.indptr[i + 1]
+        if start == stop:
+            continue
+        idx = rows.indices[start:stop]
+        confidence = ALS_ALPHA * rows.data[start:stop]
+        factors = fixed[idx]
+        A = gram + (factors.T * confidence) @ factors + reg
+        b = (factors.T * (1.0 + confidence)).sum(axis=1)
+        out[i] = np.linalg.solve(A, b)
+    return out
+
+
+def fold_in_projector(sigma, Vt, regularization=0.0):
+    """P (books x k) so that a user with borrow vector x gets the row x @ P."""
+    items = Vt.T * sigma
+    return items @ np.linalg.pinv(items.T @ items + regularization * np.eye(len(sigma)))
+
+
+def item_projector(U, sigma, regularization=0.0):
+    """Q (users x k) so that a book borrowed by the users in a gets the Vt column a @ Q."""
+    users = U * sigma
+    return users @ np.linalg.pinv(users.T @ users + regularization * np.eye(len(sigma)))
@@ -0,0 +1,50 @@
+"""
+Overdue fines computed inside SQLite.
+
+Same policy as BorrowReturnSystem.calculate_fine: once a loan is more than
+GRACE_DAYS whole days past its due date it costs RATE_PER_DAY for every day
+beyond the grace period. Open loans are measured against the current local
+time, returned loans against their return date, and unparsable dates give
+no fine.
+
+refresh_fines() brings the stored borrowings.fine column up to date with a
+single UPDATE (touching only rows whose fine actually changes), and the
+borrowing_fines view (migration 5, _fines_view in migrations.py) exposes the
+live value as current_fine for reads that must not wait for a refresh. A
+change to the policy here needs a migration that recreates that view.
+"""
+
+GRACE_DAYS = 14
+RATE_PER_DAY = 10
+
+
+def fine_expression(due="due_date", returned="return_date"):
+    """SQL expression for the fine of a loan given its due and return date columns."""
+    end = f"julianday(COALESCE(NULLIF({returned}, ''), datetime('now', 'localtime')))"
+    days = f"CAST({end} - julianday({due}) AS INTEGER)"
+    return f"(CASE WHEN {days} > {GRACE_DAYS} THEN ({days} - {GRACE_DAYS}) * {RATE_PER_DAY} ELSE 0 END)"
+
+
+FINE_EXPR = fine_expression()
+
+
+def refresh_fines(conn, borrowing_id=None, open_only=True):
+    """Recompute stored fines in one statement. Returns the number of rows changed.
+
+    With borrowing_id only that loan is refreshed; otherwise every open loan
+    (or every loan when open_only is False).
+    """
+    where = [f"fine IS NOT {FINE_EXPR}"]
+    params = []
+    if borrowing_id is not None:
+        where.append("id = ?")
+        params.append(borrowing_id)
+    elif open_only:
+        where.append("return_date IS NULL")
+    cursor = conn.execute(f"UPDATE borrowings SET fine = {FINE_EXPR} WHERE {' AND '.join(where)}", params)
+    return cursor.rowcount
+
+
+def current_fine(conn, borrowing_id):
+    row = conn.execute("SELECT current_fine FROM borrowing_fines WHERE id = ?", (borrowing_id,)).fetchone()
+    return row[0] if row else 0
@@ -0,0 +1,91 @@
+"""
+On-disk cache of the pre-composited login background.
+
+Scaling the full-size JPEG to the screen with LANCZOS and compositing the
+dim overlay is slow, and the login screen is shown on every start and after
+every logout. The finished image is therefore stored once per screen
+resolution as a PPM file in assets/.cache, which Tk loads natively with
+tk.PhotoImage (no Pillow needed on a cache hit). The source file's mtime is
+part of the cache file name, so replacing the image invalidates the cache.
+"""
+import logging
+import os
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except Exception:
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Opacity of the black overlay that dims the background
+OVERLAY_ALPHA = 0.30
+
+
+def cache_dir(source):
+    return os.path.join(os.path.dirname(source), ".cache")
+
+
+def cache_path(source, width, height):
+    stem = os.path.splitext(os.path.basename(source))[0]
+    mtime = os.stat(source).st_mtime_ns
+    return os.path.join(cache_dir(source), f"{stem}-{width}x{height}-a{int(OVERLAY_ALPHA * 100)}-{mtime}.ppm")
+
+
+def render(source, width, height):
+    """The background scaled to width x height with the dim overlay, as an RGB image."""
+    img = Image.open(source).convert('RGBA')
+    img = img.resize((width, height), Image.LANCZOS)
+    overlay = Image.new('RGBA', (width, height), (0, 0, 0, int(255 * OVERLAY_ALPHA)))
+    return Image.alpha_composite(img, overlay).convert('RGB')
+
+
+def login_background(source, width, height, master):
+    """The background for this resolution as a Tk PhotoImage, rendering (and caching) it on a miss.
+
+    If the cache cannot be written (read-only install, full disk) the image
+    rendered in memory is used. Returns None when there is no cached copy
+    and Pillow is not installed.
+    """
+    import tkinter as tk
+
+    path = cache_path(source, width, height)
+    if os.path.exists(path):
+        return tk.PhotoImage(file=path, master=master)
+    if not PIL_AVAILABLE:
+        return None
+    image = render(source, width, height)
+    try:
+        _store(source, image, path)
+    except OSError as e:
+        logger.warning("Could not cache the login background in %s: %s", cache_dir(source), e)
+        from PIL import ImageTk
+        return ImageTk.PhotoImage(image, master=master)
+    return tk.PhotoImage(file=path, master=master)
+
+
+def _store(source, image, path):
+    os.makedirs(cache_dir(source), exist_ok=True)
+    tmp = path + ".tmp"
+    try:
+        image.save(tmp, format="PPM")
+        os.replace(tmp, path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _remove_stale(source, path)
+    logger.debug("Cached login background %s", path)
+
+
+def _remove_stale(source, keep):
+    # Renders of an older version of the source image
+    stem = os.path.splitext(os.path.basename(source))[0]
+    current = os.path.basename(keep).rsplit("-", 1)[1]
+    for name in os.listdir(cache_dir(source)):
+        if name.startswith(stem + "-") and name.endswith(".ppm") and not name.endswith("-" + current):
+            try:
+                os.remove(os.path.join(cache_dir(source), name))
+            except OSError:
+                pass
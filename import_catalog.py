@@ -0,0 +1,257 @@
+"""
+Streaming bulk import of catalog files (CSV or JSON lines).
+
+Records are read one at a time, validated and normalized in a generator
+pipeline, and written in chunks of CHUNK_SIZE rows with executemany, one
+transaction per chunk, so memory stays flat whatever the file size. A book
+whose ISBN is already in the catalogue is updated in place (its available
+count moves with the change in quantity) instead of being rejected.
+
+While the load runs, the triggers on books (full-text search and the
+catalogue counters) and its secondary indexes are dropped; they are
+recreated and rebuilt once at the end, which is far cheaper than
+maintaining them row by row. Triggers on users and borrowings stay in place,
+so borrows on other terminals keep their statistics current. The dropped
+DDL is saved in deferred_maintenance in the same transaction that drops it,
+and init_db() restores anything still listed there, so a load that is
+killed or crashes does not lose them. (A terminal started while a load is
+running restores them early too; the load then just runs slower.) Rows that fail validation are written
+with the reason to a side file next to the input (<input>.rejects.csv).
+
+    python import_catalog.py books.csv
+    python import_catalog.py books.jsonl --chunk-size 10000
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+
+import catalog_search
+import library_stats
+from db import write
+from db_init import DB_NAME, init_db
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000
+# Print progress every this many rows
+PROGRESS_EVERY = 100000
+
+UPSERT = """
+INSERT INTO books (title, author, isbn, genre, publication_year, quantity, available)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(isbn) DO UPDATE SET
+    title = excluded.title,
+    author = excluded.author,
+    genre = excluded.genre,
+    publication_year = excluded.publication_year,
+    available = MAX(0, books.available + excluded.quantity - books.quantity),
+    quantity = excluded.quantity
+"""
+
+
+class Rejected(ValueError):
+    pass
+
+
+# -- reading -----------------------------------------------------------
+
+def detect_format(path):
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def read_records(path, fmt=None):
+    """Yield (line number, dict) from a CSV (with header) or JSON-lines file."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if (fmt or detect_format(path)) == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, {"_error": f"invalid JSON: {e.msg}", "_raw": line.strip()}
+                    continue
+                yield line_no, record if isinstance(record, dict) else {"_error": "not an object", "_raw": line.strip()}
+
+
+# -- validation --------------------------------------------------------
+
+def normalize_isbn(value):
+    isbn = re.sub(r"[\s\-]", "", str(value or "")).upper()
+    if not re.fullmatch(r"\d{9}[\dX]|\d{13}", isbn):
+        raise Rejected(f"invalid ISBN {value!r}")
+    return isbn
+
+
+def _text(record, field, required):
+    value = record.get(field)
+    value = " ".join(str(value).split()) if value is not None else ""
+    if required and not value:
+        raise Rejected(f"missing {field}")
+    return value or None
+
+
+def _int(record, field, default, low, high):
+    value = record.get(field)
+    if value is None or str(value).strip() == "":
+        return default
+    try:
+        number = int(float(str(value).strip()))
+    except ValueError:
+        raise Rejected(f"{field} is not a number: {value!r}")
+    if not low <= number <= high:
+        raise Rejected(f"{field} out of range: {number}")
+    return number
+
+
+def normalize(record):
+    """One books row (title, author, isbn, genre, publication_year, quantity, available) or Rejected."""
+    if "_error" in record:
+        raise Rejected(record["_error"])
+    record = {str(k).strip().lower(): v for k, v in record.items() if k is not None}
+    title = _text(record, "title", True)
+    author = _text(record, "author", True)
+    isbn = normalize_isbn(record.get("isbn"))
+    genre = _text(record, "genre", False)
+    year = _int(record, "publication_year", None, 0, datetime.now().year + 1)
+    quantity = _int(record, "quantity", 1, 0, 1000000)
+    return title, author, isbn, genre, year, quantity, quantity
+
+
+def validated(records, rejects):
+    """Yield normalized rows; hand (line, reason, record) of bad ones to rejects()."""
+    for line_no, record in records:
+        try:
+            yield normalize(record)
+        except Rejected as e:
+            rejects(line_no, str(e), record)
+
+
+def chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# -- deferred maintenance ----------------------------------------------
+
+def defer_maintenance(conn):
+    """Drop the triggers and secondary indexes on books, saving their DDL in deferred_maintenance."""
+    objects = conn.execute("""
+    SELECT name, type, sql FROM sqlite_master
+    WHERE tbl_name = 'books' AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    """).fetchall()
+    # A previous load that never finished may have saved some already
+    conn.executemany("INSERT OR IGNORE INTO deferred_maintenance (name, type, sql) VALUES (?, ?, ?)", objects)
+    for name, kind, _ in objects:
+        conn.execute(f"DROP {kind.upper()} {name}")
+
+
+def restore_maintenance(conn):
+    """Recreate everything listed in deferred_maintenance and rebuild what it maintains."""
+    for name, sql in conn.execute("SELECT name, sql FROM deferred_maintenance").fetchall():
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is None:
+            conn.execute(sql)
+    conn.execute("DELETE FROM deferred_maintenance")
+    if catalog_search.has_index(conn):
+        catalog_search.rebuild(conn)
+    library_stats.rebuild(conn)
+    conn.execute("ANALYZE books")
+
+
+def recover(conn):
+    """Restore maintenance left deferred by an import that never finished. Returns True if there was any."""
+    if conn.execute("SELECT 1 FROM deferred_maintenance LIMIT 1").fetchone() is None:
+        return False
+    logger.warning("Restoring indexes and triggers on books left dropped by an unfinished catalog import")
+    restore_maintenance(conn)
+    return True
+
+
+# -- driver ------------------------------------------------------------
+
+def import_file(path, db_name=DB_NAME, fmt=None, chunk_size=CHUNK_SIZE, defer=True, rejects_path=None,
+                progress=None):
+    """Import path into books. Returns a dict of counts and timing."""
+    rejects_path = rejects_path or path + ".rejects.csv"
+    counts = {"rows": 0, "rejected": 0}
+    started = time.perf_counter()
+
+    with open(rejects_path, "w", newline="", encoding="utf-8") as rejects_file:
+        reject_writer = csv.writer(rejects_file)
+        reject_writer.writerow(["line", "reason", "record"])
+
+        def reject(line_no, reason, record):
+            counts["rejected"] += 1
+            raw = record.get("_raw") if "_raw" in record else json.dumps(record, ensure_ascii=False, default=str)
+            reject_writer.writerow([line_no, reason, raw])
+
+        records = read_records(path, fmt)
+        if defer:
+            write(defer_maintenance, db_name)
+        try:
+            next_report = PROGRESS_EVERY
+            for chunk in chunks(validated(records, reject), chunk_size):
+                write(lambda conn: conn.executemany(UPSERT, chunk), db_name)
+                counts["rows"] += len(chunk)
+                if progress and counts["rows"] >= next_report:
+                    progress(counts["rows"], counts["rejected"], time.perf_counter() - started)
+                    next_report += PROGRESS_EVERY
+        finally:
+            if defer:
+                rebuild_started = time.perf_counter()
+                write(restore_maintenance, db_name)
+                counts["rebuild_seconds"] = time.perf_counter() - rebuild_started
+
+    counts["seconds"] = time.perf_counter() - started
+    counts["rows_per_second"] = counts["rows"] / counts["seconds"] if counts["seconds"] else 0.0
+    counts["rejects_path"] = rejects_path
+    if not counts["rejected"]:
+        os.remove(rejects_path)
+        counts["rejects_path"] = None
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a CSV or JSON-lines catalog file into the books table.")
+    parser.add_argument("path", help="input file (columns: title, author, isbn, genre, publication_year, quantity)")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="input format (default: from the file extension)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per transaction")
+    parser.add_argument("--no-defer", action="store_true",
+                        help="keep indexes and search/statistics triggers live during the load")
+    parser.add_argument("--rejects", help="where to write rejected rows (default: <path>.rejects.csv)")
+    args = parser.parse_args()
+    init_db()
+
+    def progress(rows, rejected, seconds):
+        print(f"  {rows} rows ({rejected} rejected), {rows / seconds:.0f} rows/s", flush=True)
+
+    try:
+        counts = import_file(args.path, fmt=args.format, chunk_size=args.chunk_size, defer=not args.no_defer,
+                             rejects_path=args.rejects, progress=progress)
+    except OSError as e:
+        print(f"Error reading {args.path}: {e}")
+        sys.exit(1)
+    print(f"Imported {counts['rows']} books in {counts['seconds']:.1f}s ({counts['rows_per_second']:.0f} rows/s)")
+    if "rebuild_seconds" in counts:
+        print(f"Index and search rebuild: {counts['rebuild_seconds']:.1f}s")
+    if counts["rejected"]:
+        print(f"Rejected {counts['rejected']} rows, see {counts['rejects_path']}")
+
+
+if __name__ == "__main__":
+    main()
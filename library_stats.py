@@ -0,0 +1,55 @@
+"""
+Materialized dashboard counters kept up to date by triggers.
+
+library_stats holds the single row of global counters, genre_stats the
+number of titles per genre (NULL genres are counted under ''), and
+user_stats each member's open loans and total fines. Triggers created with
+the tables by migration 4 (_dashboard_counters in migrations.py) adjust
+them on every insert, delete and relevant update of books, users and
+borrowings, so the dashboard reads a handful of rows instead of scanning
+the whole borrowing history.
+
+rebuild() recomputes everything from scratch (used after bulk loads that
+run with the triggers on books dropped).
+"""
+
+
+def rebuild(conn):
+    """Recompute every counter from the base tables."""
+    conn.execute("DELETE FROM library_stats")
+    conn.execute("""
+    INSERT INTO library_stats (id, total_books, total_copies, total_users, total_borrowings, active_borrowings)
+    VALUES (1,
+        (SELECT COUNT(*) FROM books),
+        (SELECT IFNULL(SUM(quantity), 0) FROM books),
+        (SELECT COUNT(*) FROM users),
+        (SELECT COUNT(*) FROM borrowings),
+        (SELECT COUNT(*) FROM borrowings WHERE return_date IS NULL))
+    """)
+    conn.execute("DELETE FROM genre_stats")
+    conn.execute("INSERT INTO genre_stats (genre, books) SELECT IFNULL(genre, ''), COUNT(*) FROM books GROUP BY IFNULL(genre, '')")
+    conn.execute("DELETE FROM user_stats")
+    conn.execute("""
+    INSERT INTO user_stats (username, active_loans, total_fines)
+    SELECT username, SUM(return_date IS NULL), IFNULL(SUM(fine), 0) FROM borrowings GROUP BY username
+    """)
+
+
+def read(conn, username):
+    """Return the dashboard statistics dict for username."""
+    row = conn.execute("""
+    SELECT total_books, total_copies, total_users, total_borrowings, active_borrowings
+    FROM library_stats WHERE id = 1
+    """).fetchone() or (0, 0, 0, 0, 0)
+    genre = conn.execute("SELECT genre FROM genre_stats WHERE books > 0 ORDER BY books DESC LIMIT 1").fetchone()
+    mine = conn.execute("SELECT total_fines, active_loans FROM user_stats WHERE username = ?", (username,)).fetchone() or (0, 0)
+    return {
+        "total_books": row[0],
+        "total_copies": row[1],
+        "total_users": row[2],
+        "total_borrowings": row[3],
+        "active_borrowings": row[4],
+        "popular_genre": genre[0] if genre and genre[0] else "N/A",
+        "total_fines": mine[0],
+        "my_active": mine[1]
+    }
@@ -2,41 +2,52 @@ import logging
 import tkinter as tk
 from tkinter import messagebox, ttk
 import sqlite3
-import bcrypt
-from db_init import init_db, DB_NAME
+import auth_policy
+import login_throttle
+from db_init import init_db
+from db import get_connection, write
 import os
-try:
-    from PIL import Image, ImageTk
-    PIL_AVAILABLE = True
-except Exception:
-    PIL_AVAILABLE = False
+import image_cache
+import background
 
 logger = logging.getLogger(__name__)
 if not logger.handlers:
     logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(levelname)s:%(name)s:%(message)s')
 
 def register_user(username, password, is_admin=0):
-    hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    hashed = auth_policy.hash_password(password)
     try:
-        with sqlite3.connect(DB_NAME) as conn:
-            c = conn.cursor()
-            c.execute("INSERT INTO users (username, password_hash, is_admin) VALUES (?, ?, ?)", (username, hashed, is_admin))
-            conn.commit()
-            logger.info("Registered user %s admin=%s", username, is_admin)
-            return True
+        write(lambda conn: conn.execute("INSERT INTO users (username, password_hash, is_admin) VALUES (?, ?, ?)", (username, hashed, is_admin)))
+        logger.info("Registered user %s admin=%s", username, is_admin)
+        return True
     except sqlite3.IntegrityError:
         logger.warning("Attempt to register duplicate username %s", username)
         return False
 
-def login_user(username, password):
+def login_user(username, password, terminal=None):
+    """(success, is_admin). Raises login_throttle.LoginThrottled when attempts are coming in too fast."""
+    # Rate limit before any bcrypt work is done
+    login_throttle.check(username, terminal)
     try:
-        with sqlite3.connect(DB_NAME) as conn:
+        with get_connection() as conn:
             c = conn.cursor()
             c.execute("SELECT password_hash, is_admin FROM users WHERE username = ?", (username,))
             row = c.fetchone()
-            if row and bcrypt.checkpw(password.encode(), row[0]):
-                logger.info("User %s logged in (admin=%s)", username, row[1])
-                return True, row[1]
+            if row:
+                ok, seconds = auth_policy.check_password(password, row[0])
+                rehashed = False
+                if ok and auth_policy.needs_rehash(row[0]):
+                    # Move the stored hash to the current cost while we have the plain password
+                    new_hash = auth_policy.hash_password(password)
+                    rehashed = write(lambda conn: conn.execute(
+                        "UPDATE users SET password_hash = ? WHERE username = ? AND password_hash = ?",
+                        (new_hash, username, row[0])).rowcount == 1)
+                auth_policy.record_login(username, seconds, row[0], rehashed)
+                if ok:
+                    logger.info("User %s logged in (admin=%s)", username, row[1])
+                    return True, row[1]
+            else:
+                auth_policy.reject_unknown()
             logger.info("Failed login attempt for user %s", username)
             return False, 0
     except sqlite3.Error as e:
@@ -44,7 +55,34 @@ def login_user(username, password):
         return False, 0
 
 def launch_login_gui(on_success):
+    # bcrypt is deliberately slow, so hashing runs on a worker thread (background.py)
+    # and the window stays responsive; this holds the pending task while it runs
+    pending = {"task": None}
+
+    def set_pending(message):
+        login_btn.config(state="disabled")
+        register_btn.config(state="disabled")
+        root.config(cursor="watch")
+        status_label.config(text=message, fg="#5f6368")
+
+    def clear_pending():
+        pending["task"] = None
+        login_btn.config(state="normal")
+        register_btn.config(state="normal")
+        root.config(cursor="")
+
+    def show_error(error):
+        clear_pending()
+        if isinstance(error, login_throttle.LoginThrottled):
+            status_label.config(text=f"Too many attempts. Please wait {max(1, round(error.retry_after))}s and try again.",
+                                fg="#e74c3c")
+            return
+        logger.error("Login/registration failed: %s", error)
+        status_label.config(text=f"Something went wrong: {error}", fg="#e74c3c")
+
     def handle_login():
+        if pending["task"] is not None:
+            return
         username = username_entry.get().strip()
         password = password_entry.get()
         
@@ -53,7 +91,13 @@ def launch_login_gui(on_success):
             status_label.config(text="Please enter both username and password.", fg="#e74c3c")
             return
         
-        success, is_admin = login_user(username, password)
+        set_pending("Signing in...")
+        pending["task"] = background.run(root, login_user, username, password,
+                                         on_done=lambda result: finish_login(username, result), on_error=show_error)
+
+    def finish_login(username, result):
+        clear_pending()
+        success, is_admin = result
         if success:
             status_label.config(text=f"Welcome back, {username}!", fg="#2ecc71")
             # Disable buttons to prevent double-clicks
@@ -73,6 +117,8 @@ def launch_login_gui(on_success):
             password_entry.focus()
 
     def handle_register():
+        if pending["task"] is not None:
+            return
         username = username_entry.get().strip()
         password = password_entry.get()
         
@@ -89,7 +135,13 @@ def launch_login_gui(on_success):
             status_label.config(text="Password must be at least 6 characters.", fg="#e74c3c")
             return
         
-        if register_user(username, password):
+        set_pending("Creating account...")
+        pending["task"] = background.run(root, register_user, username, password,
+                                         on_done=finish_register, on_error=show_error)
+
+    def finish_register(registered):
+        clear_pending()
+        if registered:
             status_label.config(text="Registration successful! Please login.", fg="#2ecc71")
             password_entry.delete(0, tk.END)
             username_entry.focus()
@@ -118,26 +170,23 @@ def launch_login_gui(on_success):
     root.title("A&Y Library Login")
     root.attributes('-fullscreen', True)
 
-    # Attempt to load background image (assets/library_bg.jpg). If Pillow not available
-    # or file missing, fall back to a plain background color.
+    # Attempt to load background image (assets/library_bg.jpg), pre-scaled and dimmed once per
+    # screen size by image_cache. If it cannot be rendered, fall back to a plain background color.
     bg_image_path = os.path.join(os.path.dirname(__file__), 'assets', 'library_bg.jpg')
-    if PIL_AVAILABLE and os.path.exists(bg_image_path):
+    sw = root.winfo_screenwidth()
+    sh = root.winfo_screenheight()
+    bg_photo = None
+    if os.path.exists(bg_image_path):
+        try:
+            # Explicit master avoids Tkinter image lifecycle issues
+            bg_photo = image_cache.login_background(bg_image_path, sw, sh, root)
+        except Exception as e:
+            logger.exception("Failed to prepare background image: %s", e)
+    if bg_photo is not None:
         try:
-            # Get screen size and prepare background with dim overlay (~30%)
-            sw = root.winfo_screenwidth()
-            sh = root.winfo_screenheight()
-            img = Image.open(bg_image_path).convert('RGBA')
-            img = img.resize((sw, sh), Image.LANCZOS)
-            overlay = Image.new('RGBA', (sw, sh), (0, 0, 0, int(255 * 0.30)))
-            img = Image.alpha_composite(img, overlay)
-
-            # Convert to RGB and create PhotoImage with explicit master to avoid Tkinter image lifecycle issues
-            rgb_img = img.convert('RGB')
-
             canvas = tk.Canvas(root, width=sw, height=sh, highlightthickness=0)
             canvas.pack(fill='both', expand=True)
 
-            bg_photo = ImageTk.PhotoImage(rgb_img, master=root)
             # Keep a strong reference on the root and canvas to avoid GC and Tcl image disposal
             root._bg_photo = bg_photo
             canvas.bg_photo = bg_photo  # also keep on canvas
@@ -0,0 +1,114 @@
+"""
+Token-bucket rate limiting of login attempts.
+
+Every attempt takes one token from three buckets: the username's, the
+terminal's and a global one. A bucket holds up to `capacity` tokens and
+refills at `rate` tokens per second, so short bursts (a mistyped password
+or two) go through while a stuck key or a scripted guesser is turned away
+before any bcrypt work is done. check() raises LoginThrottled, which says
+which bucket ran dry and when to try again.
+
+Counters of allowed and throttled attempts per scope are kept in `counters`
+for monitoring (see stats()).
+"""
+import socket
+import threading
+import time
+
+# (capacity, tokens refilled per second)
+USER_LIMIT = (5, 1 / 30)
+TERMINAL_LIMIT = (20, 1.0)
+GLOBAL_LIMIT = (60, 5.0)
+# Per-username buckets kept before idle (full) ones are dropped
+MAX_TRACKED_USERS = 10000
+
+TERMINAL = socket.gethostname()
+
+
+class LoginThrottled(Exception):
+    def __init__(self, scope, retry_after):
+        super().__init__(f"Too many login attempts ({scope}); try again in {retry_after:.0f}s")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now):
+        self._refill(now)
+        return self.tokens >= 1
+
+    def take(self):
+        self.tokens -= 1
+
+    def retry_after(self):
+        return (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+
+    def full(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+_lock = threading.Lock()
+_global = TokenBucket(*GLOBAL_LIMIT)
+_terminals = {}
+_users = {}
+counters = {"allowed": 0, "throttled_user": 0, "throttled_terminal": 0, "throttled_global": 0}
+
+
+def _bucket(buckets, key, limit):
+    bucket = buckets.get(key)
+    if bucket is None:
+        bucket = buckets[key] = TokenBucket(*limit)
+    return bucket
+
+
+def _prune(now):
+    for key in [key for key, bucket in _users.items() if bucket.full(now)]:
+        del _users[key]
+
+
+def check(username, terminal=None):
+    """Take a token for this attempt or raise LoginThrottled. Call before checking the password."""
+    terminal = terminal or TERMINAL
+    now = time.monotonic()
+    with _lock:
+        if len(_users) > MAX_TRACKED_USERS:
+            _prune(now)
+        buckets = [
+            ("global", _global),
+            ("terminal", _bucket(_terminals, terminal, TERMINAL_LIMIT)),
+            ("user", _bucket(_users, username.lower(), USER_LIMIT)),
+        ]
+        for scope, bucket in buckets:
+            if not bucket.available(now):
+                counters[f"throttled_{scope}"] += 1
+                raise LoginThrottled(scope, bucket.retry_after())
+        for _, bucket in buckets:
+            bucket.take()
+        counters["allowed"] += 1
+
+
+def stats():
+    with _lock:
+        return dict(counters, tracked_users=len(_users), tracked_terminals=len(_terminals))
+
+
+def reset():
+    """Forget all buckets and counters (tests, or an admin clearing a lockout)."""
+    global _global
+    with _lock:
+        _global = TokenBucket(*GLOBAL_LIMIT)
+        _terminals.clear()
+        _users.clear()
+        for key in counters:
+            counters[key] = 0
@@ -1,16 +1,19 @@
+import startup
 import tkinter as tk
 from tkinter import ttk, messagebox
 from login import launch_login_gui
 from borrow_return import BorrowGUI, ReturnGUI, HistoryGUI, RecommendationsGUI, setup_styles
 from admin import AdminPanel
 import sqlite3
-from db_init import DB_NAME
+from db import get_connection
+import library_stats
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 if not logger.handlers:
     logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(levelname)s:%(name)s:%(message)s')
+startup.mark("modules imported")
 
 class Dashboard:
     def __init__(self, root, username, is_admin):
@@ -31,35 +34,9 @@ class Dashboard:
 
     def get_statistics(self):
         try:
-            with sqlite3.connect(DB_NAME) as conn:
-                c = conn.cursor()
-                c.execute("SELECT COUNT(*) FROM books")
-                total_books = c.fetchone()[0]
-                c.execute("SELECT SUM(quantity) FROM books")
-                total_copies = c.fetchone()[0] or 0
-                c.execute("SELECT COUNT(*) FROM users")
-                total_users = c.fetchone()[0]
-                c.execute("SELECT COUNT(*) FROM borrowings")
-                total_borrowings = c.fetchone()[0] or 0
-                c.execute("SELECT COUNT(*) FROM borrowings WHERE return_date IS NULL")
-                active_borrowings = c.fetchone()[0] or 0
-                c.execute("SELECT genre, COUNT(*) as count FROM books GROUP BY genre ORDER BY count DESC LIMIT 1")
-                popular_genre = c.fetchone()
-                c.execute("SELECT SUM(fine) FROM borrowings WHERE username = ?", (self.username,))
-                total_fines = c.fetchone()[0] or 0
-                c.execute("SELECT COUNT(*) FROM borrowings WHERE username = ? AND return_date IS NULL", (self.username,))
-                my_active = c.fetchone()[0] or 0
-                stats = {
-                    "total_books": total_books,
-                    "total_copies": total_copies,
-                    "total_users": total_users,
-                    "total_borrowings": total_borrowings,
-                    "active_borrowings": active_borrowings,
-                    "popular_genre": popular_genre[0] if popular_genre else "N/A",
-                    "total_fines": total_fines,
-                    "my_active": my_active
-                }
-                return stats
+            # Counters are maintained by triggers (library_stats.py), so this reads a few rows
+            with get_connection() as conn:
+                return library_stats.read(conn, self.username)
         except sqlite3.Error as e:
             print(f"Error querying statistics: {e}")
             return {
@@ -309,6 +286,12 @@ class MainMenu:
         self.root.attributes('-fullscreen', True)
         self.root.configure(bg="#f5f7fa")
         self.setup_gui()
+        self.root.after_idle(self.on_shown)
+
+    def on_shown(self):
+        startup.mark("main menu shown")
+        # Load the recommendation stack while the user is still on the menu
+        startup.warm_up(self.root)
 
     def setup_gui(self):
         # Top decorative bar
@@ -0,0 +1,374 @@
+"""
+Versioned schema migrations keyed on PRAGMA user_version.
+
+Each entry in MIGRATIONS upgrades the schema by one version and runs in its
+own transaction together with the user_version bump, so a database is never
+left half-migrated. Databases created before migrations existed (including
+the checked-in database.db, whose tables were created by an older script)
+start at version 0 and are brought forward step by step.
+
+To change the schema, append a new (version, function) pair - never edit a
+migration that has already shipped.
+"""
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _baseline(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        is_admin INTEGER DEFAULT 0
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS books (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        author TEXT NOT NULL,
+        isbn TEXT UNIQUE NOT NULL,
+        genre TEXT,
+        publication_year INTEGER,
+        quantity INTEGER NOT NULL,
+        available INTEGER NOT NULL,
+        date_added TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS borrowings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        book_id INTEGER,
+        username TEXT NOT NULL,
+        borrow_date TEXT NOT NULL,
+        due_date TEXT NOT NULL,
+        return_date TEXT,
+        fine INTEGER DEFAULT 0,
+        FOREIGN KEY(book_id) REFERENCES books(id),
+        FOREIGN KEY(username) REFERENCES users(username)
+    )
+    """)
+    # Older databases predate fine tracking
+    if "fine" not in _columns(conn, "borrowings"):
+        conn.execute("ALTER TABLE borrowings ADD COLUMN fine INTEGER DEFAULT 0")
+
+
+def _hot_path_indexes(conn):
+    statements = [
+        # History screen, per-user fine/loan totals, deleting a user
+        "CREATE INDEX IF NOT EXISTS idx_borrowings_user_date ON borrowings(username, borrow_date)",
+        # Return screen and "my active loans": open loans of one user, newest first
+        "CREATE INDEX IF NOT EXISTS idx_borrowings_open_user ON borrowings(username, borrow_date) WHERE return_date IS NULL",
+        # Active copies of a book when editing its quantity
+        "CREATE INDEX IF NOT EXISTS idx_borrowings_open_book ON borrowings(book_id) WHERE return_date IS NULL",
+        # Fine refresh over open loans
+        "CREATE INDEX IF NOT EXISTS idx_borrowings_open_due ON borrowings(due_date) WHERE return_date IS NULL",
+        # Recommendation interactions and already-borrowed lookups
+        "CREATE INDEX IF NOT EXISTS idx_borrowings_user_book ON borrowings(username, book_id)",
+        # Popularity fallback (GROUP BY book_id) and book joins
+        "CREATE INDEX IF NOT EXISTS idx_borrowings_book ON borrowings(book_id)",
+        # Admin fines report
+        "CREATE INDEX IF NOT EXISTS idx_borrowings_fined ON borrowings(fine) WHERE fine > 0",
+        # Borrow window: available books sorted by title
+        "CREATE INDEX IF NOT EXISTS idx_books_available_title ON books(title) WHERE available > 0",
+        # Full catalog sorted by title
+        "CREATE INDEX IF NOT EXISTS idx_books_title ON books(title)",
+        # Dashboard popular genre
+        "CREATE INDEX IF NOT EXISTS idx_books_genre ON books(genre)",
+        # "Last remaining admin" check
+        "CREATE INDEX IF NOT EXISTS idx_users_admin ON users(username) WHERE is_admin = 1",
+    ]
+    for statement in statements:
+        conn.execute(statement)
+    conn.execute("ANALYZE")
+
+
+# The steps below spell out their SQL instead of calling the modules that
+# now own these objects, so later edits to those modules cannot change what
+# an old migration does.
+
+def _catalog_fts(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp._fts5_probe")
+    except sqlite3.OperationalError:
+        logger.warning("SQLite was built without FTS5; catalog search will use LIKE scans")
+        return
+    conn.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+        title, author, isbn, genre,
+        content='books', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """)
+    conn.execute("INSERT INTO books_fts(books_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 2.0, 1.0)')")
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, author, isbn, genre)
+        VALUES (new.id, new.title, new.author, new.isbn, new.genre);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, isbn, genre)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn, old.genre);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author, isbn, genre ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, isbn, genre)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn, old.genre);
+        INSERT INTO books_fts(rowid, title, author, isbn, genre)
+        VALUES (new.id, new.title, new.author, new.isbn, new.genre);
+    END
+    """)
+    conn.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+
+
+def _dashboard_counters(conn):
+    statements = [
+        """
+        CREATE TABLE IF NOT EXISTS library_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_books INTEGER NOT NULL DEFAULT 0,
+            total_copies INTEGER NOT NULL DEFAULT 0,
+            total_users INTEGER NOT NULL DEFAULT 0,
+            total_borrowings INTEGER NOT NULL DEFAULT 0,
+            active_borrowings INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS genre_stats (
+            genre TEXT PRIMARY KEY,
+            books INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_genre_stats_books ON genre_stats(books)",
+        """
+        CREATE TABLE IF NOT EXISTS user_stats (
+            username TEXT PRIMARY KEY,
+            active_loans INTEGER NOT NULL DEFAULT 0,
+            total_fines INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS library_stats_books_ai AFTER INSERT ON books BEGIN
+            UPDATE library_stats SET total_books = total_books + 1,
+                total_copies = total_copies + IFNULL(new.quantity, 0) WHERE id = 1;
+            INSERT INTO genre_stats (genre, books) VALUES (IFNULL(new.genre, ''), 1)
+            ON CONFLICT(genre) DO UPDATE SET books = books + excluded.books;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS library_stats_books_ad AFTER DELETE ON books BEGIN
+            UPDATE library_stats SET total_books = total_books - 1,
+                total_copies = total_copies - IFNULL(old.quantity, 0) WHERE id = 1;
+            INSERT INTO genre_stats (genre, books) VALUES (IFNULL(old.genre, ''), -1)
+            ON CONFLICT(genre) DO UPDATE SET books = books + excluded.books;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS library_stats_books_au AFTER UPDATE OF quantity, genre ON books BEGIN
+            UPDATE library_stats SET total_copies = total_copies - IFNULL(old.quantity, 0) + IFNULL(new.quantity, 0)
+            WHERE id = 1;
+            INSERT INTO genre_stats (genre, books) VALUES (IFNULL(old.genre, ''), -1)
+            ON CONFLICT(genre) DO UPDATE SET books = books + excluded.books;
+            INSERT INTO genre_stats (genre, books) VALUES (IFNULL(new.genre, ''), 1)
+            ON CONFLICT(genre) DO UPDATE SET books = books + excluded.books;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS library_stats_users_ai AFTER INSERT ON users BEGIN
+            UPDATE library_stats SET total_users = total_users + 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS library_stats_users_ad AFTER DELETE ON users BEGIN
+            UPDATE library_stats SET total_users = total_users - 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS library_stats_borrowings_ai AFTER INSERT ON borrowings BEGIN
+            UPDATE library_stats SET total_borrowings = total_borrowings + 1,
+                active_borrowings = active_borrowings + (new.return_date IS NULL) WHERE id = 1;
+            INSERT INTO user_stats (username, active_loans, total_fines)
+            VALUES (new.username, (new.return_date IS NULL), IFNULL(new.fine, 0))
+            ON CONFLICT(username) DO UPDATE SET
+                active_loans = active_loans + excluded.active_loans,
+                total_fines = total_fines + excluded.total_fines;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS library_stats_borrowings_ad AFTER DELETE ON borrowings BEGIN
+            UPDATE library_stats SET total_borrowings = total_borrowings - 1,
+                active_borrowings = active_borrowings - (old.return_date IS NULL) WHERE id = 1;
+            INSERT INTO user_stats (username, active_loans, total_fines)
+            VALUES (old.username, - (old.return_date IS NULL), - IFNULL(old.fine, 0))
+            ON CONFLICT(username) DO UPDATE SET
+                active_loans = active_loans + excluded.active_loans,
+                total_fines = total_fines + excluded.total_fines;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS library_stats_borrowings_au AFTER UPDATE OF return_date, fine, username ON borrowings BEGIN
+            UPDATE library_stats SET active_borrowings = active_borrowings
+                - (old.return_date IS NULL) + (new.return_date IS NULL) WHERE id = 1;
+            INSERT INTO user_stats (username, active_loans, total_fines)
+            VALUES (old.username, - (old.return_date IS NULL), - IFNULL(old.fine, 0))
+            ON CONFLICT(username) DO UPDATE SET
+                active_loans = active_loans + excluded.active_loans,
+                total_fines = total_fines + excluded.total_fines;
+            INSERT INTO user_stats (username, active_loans, total_fines)
+            VALUES (new.username, (new.return_date IS NULL), IFNULL(new.fine, 0))
+            ON CONFLICT(username) DO UPDATE SET
+                active_loans = active_loans + excluded.active_loans,
+                total_fines = total_fines + excluded.total_fines;
+        END
+        """,
+        "DELETE FROM library_stats",
+        """
+        INSERT INTO library_stats (id, total_books, total_copies, total_users, total_borrowings, active_borrowings)
+        VALUES (1,
+            (SELECT COUNT(*) FROM books),
+            (SELECT IFNULL(SUM(quantity), 0) FROM books),
+            (SELECT COUNT(*) FROM users),
+            (SELECT COUNT(*) FROM borrowings),
+            (SELECT COUNT(*) FROM borrowings WHERE return_date IS NULL))
+        """,
+        "DELETE FROM genre_stats",
+        "INSERT INTO genre_stats (genre, books) SELECT IFNULL(genre, ''), COUNT(*) FROM books GROUP BY IFNULL(genre, '')",
+        "DELETE FROM user_stats",
+        """
+        INSERT INTO user_stats (username, active_loans, total_fines)
+        SELECT username, SUM(return_date IS NULL), IFNULL(SUM(fine), 0) FROM borrowings GROUP BY username
+        """,
+    ]
+    for statement in statements:
+        conn.execute(statement)
+
+
+def _fines_view(conn):
+    # Fine policy at the time: Rs. 10 per day after a 14-day grace period
+    conn.execute("""
+    CREATE VIEW IF NOT EXISTS borrowing_fines AS
+    SELECT id, book_id, username, borrow_date, due_date, return_date, fine,
+           (CASE WHEN CAST(julianday(COALESCE(NULLIF(return_date, ''), datetime('now', 'localtime'))) - julianday(due_date) AS INTEGER) > 14
+                 THEN (CAST(julianday(COALESCE(NULLIF(return_date, ''), datetime('now', 'localtime'))) - julianday(due_date) AS INTEGER) - 14) * 10
+                 ELSE 0 END) AS current_fine
+    FROM borrowings
+    """)
+
+
+def _precomputed_recommendations(conn):
+    # Filled by recommend_batch.py; rank 1 is the best suggestion
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS recommendations (
+        username TEXT NOT NULL,
+        book_id INTEGER NOT NULL,
+        rank INTEGER NOT NULL,
+        score REAL NOT NULL,
+        model_version INTEGER NOT NULL,
+        PRIMARY KEY (username, rank)
+    ) WITHOUT ROWID
+    """)
+
+
+def _cooccurrence_tables(conn):
+    # Left empty; filled by cooccurrence.py when RECOMMENDER_ENGINE is "cooccurrence"
+    statements = [
+        """
+        CREATE TABLE IF NOT EXISTS book_readers (
+            book_id INTEGER PRIMARY KEY,
+            readers INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS book_cooccurrence (
+            book_a INTEGER NOT NULL,
+            book_b INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (book_a, book_b)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS book_neighbors (
+            book_id INTEGER NOT NULL,
+            rank INTEGER NOT NULL,
+            neighbor_id INTEGER NOT NULL,
+            score REAL NOT NULL,
+            PRIMARY KEY (book_id, rank)
+        ) WITHOUT ROWID
+        """,
+    ]
+    for statement in statements:
+        conn.execute(statement)
+
+
+def _report_indexes(conn):
+    # Date-range exports and the all-borrowings report, newest first
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_borrowings_date ON borrowings(borrow_date)")
+
+
+def _deferred_maintenance(conn):
+    # Index and trigger DDL on books that import_catalog.py dropped for a bulk
+    # load; init_db() re-creates anything still listed (the load never finished)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS deferred_maintenance (
+        name TEXT PRIMARY KEY,
+        type TEXT NOT NULL,
+        sql TEXT NOT NULL
+    )
+    """)
+
+
+MIGRATIONS = [
+    (1, _baseline),
+    (2, _hot_path_indexes),
+    (3, _catalog_fts),
+    (4, _dashboard_counters),
+    (5, _fines_view),
+    (6, _precomputed_recommendations),
+    (7, _cooccurrence_tables),
+    (8, _report_indexes),
+    (9, _deferred_maintenance),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply every pending migration to conn. Returns the resulting schema version."""
+    version = current_version(conn)
+    if version > LATEST_VERSION:
+        logger.warning("Database schema version %s is newer than this code (%s)", version, LATEST_VERSION)
+        return version
+    for target, step in MIGRATIONS:
+        if target <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another terminal may have applied this step while we waited for the lock
+            version = current_version(conn)
+            if target <= version:
+                conn.execute("COMMIT")
+                continue
+            logger.info("Migrating database schema %s -> %s (%s)", version, target, step.__name__.lstrip("_"))
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        version = target
+    return version
@@ -0,0 +1,154 @@
+"""
+Keyset (seek) pagination for the books, borrowings and users queries.
+
+Every page function returns a Page(rows, next_cursor). Pass next_cursor
+back to get the following page; it is None on the last page. Cursors are
+opaque strings (the sort key of the last row, encoded), so a page is found
+with an index seek on e.g. (title, id) instead of reading and discarding
+OFFSET rows, and memory stays bounded by the page size.
+
+    cursor = None
+    while True:
+        page = pagination.user_borrowings(conn, "alice", cursor)
+        ...
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+iter_rows() does that loop for batch tooling, and KeysetSource adapts a
+page function to the fetch(offset, limit) interface of the windowed views.
+Their row counts come from count(), with the same FROM and WHERE as the
+page query, so the total matches the rows that can actually be fetched.
+"""
+import base64
+import json
+from collections import namedtuple
+
+PAGE_SIZE = 100
+
+Page = namedtuple("Page", "rows next_cursor")
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+
+
+def keyset_page(conn, columns, source, keys, where="1", params=(), cursor=None,
+                page_size=PAGE_SIZE, descending=False, offset=0):
+    """Fetch one page of `SELECT columns FROM source WHERE where` ordered by keys.
+
+    keys are the sort expressions; the last one must make the order unique
+    (usually the primary key). offset is only used without a cursor, to
+    jump into the middle of a result (e.g. dragging a scrollbar).
+    """
+    key_list = ", ".join(keys)
+    direction = "DESC" if descending else "ASC"
+    sql = f"SELECT {columns}, {key_list} FROM {source} WHERE ({where})"
+    args = list(params)
+    if cursor is not None:
+        last_key = decode_cursor(cursor)
+        placeholders = ", ".join("?" for _ in keys)
+        sql += f" AND ({key_list}) {'<' if descending else '>'} ({placeholders})"
+        args.extend(last_key)
+        offset = 0
+    sql += " ORDER BY " + ", ".join(f"{key} {direction}" for key in keys)
+    sql += " LIMIT ? OFFSET ?"
+    args.extend([page_size + 1, offset])
+    rows = conn.execute(sql, args).fetchall()
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    width = len(keys)
+    next_cursor = encode_cursor(rows[-1][-width:]) if more else None
+    return Page([row[:-width] for row in rows], next_cursor)
+
+
+def count(conn, source, where="1", params=()):
+    """Number of rows of `SELECT ... FROM source WHERE where`, for the page queries below."""
+    return conn.execute(f"SELECT COUNT(*) FROM {source} WHERE ({where})", params).fetchone()[0]
+
+
+def iter_rows(page_fn, page_size=PAGE_SIZE):
+    """Yield every row of page_fn(cursor=..., page_size=...) one page at a time."""
+    cursor = None
+    while True:
+        page = page_fn(cursor=cursor, page_size=page_size)
+        yield from page.rows
+        cursor = page.next_cursor
+        if cursor is None:
+            return
+
+
+# -- named queries -----------------------------------------------------
+
+# Loans whose book still exists
+LOANS = "borrowings b JOIN books bk ON b.book_id = bk.id"
+FINED = "b.fine > 0"
+
+
+def available_books(conn, cursor=None, page_size=PAGE_SIZE, offset=0):
+    return keyset_page(conn, "id, title, author, available", "books", ["title", "id"],
+                       where="available > 0", cursor=cursor, page_size=page_size, offset=offset)
+
+
+def books(conn, cursor=None, page_size=PAGE_SIZE, offset=0, columns="*", order=("title", "id")):
+    return keyset_page(conn, columns, "books", list(order), cursor=cursor, page_size=page_size, offset=offset)
+
+
+def user_borrowings(conn, username, cursor=None, page_size=PAGE_SIZE, offset=0):
+    return keyset_page(conn, "b.id, bk.title, bk.author, b.borrow_date, b.due_date, b.return_date, b.fine",
+                       LOANS, ["b.borrow_date", "b.id"], where="b.username = ?", params=(username,),
+                       cursor=cursor, page_size=page_size, descending=True, offset=offset)
+
+
+def count_user_borrowings(conn, username):
+    return count(conn, LOANS, "b.username = ?", (username,))
+
+
+def all_borrowings(conn, cursor=None, page_size=PAGE_SIZE, offset=0):
+    return keyset_page(conn, "b.id, b.username, bk.title, b.borrow_date, b.due_date, b.return_date, b.fine",
+                       LOANS, ["b.borrow_date", "b.id"], cursor=cursor, page_size=page_size, descending=True,
+                       offset=offset)
+
+
+def fines(conn, cursor=None, page_size=PAGE_SIZE, offset=0):
+    return keyset_page(conn, "b.id, b.username, bk.title, b.fine", LOANS, ["b.id"], where=FINED,
+                       cursor=cursor, page_size=page_size, offset=offset)
+
+
+def count_fines(conn):
+    return count(conn, LOANS, FINED)
+
+
+def users(conn, cursor=None, page_size=PAGE_SIZE, offset=0):
+    return keyset_page(conn, "username, is_admin", "users", ["username"],
+                       cursor=cursor, page_size=page_size, offset=offset)
+
+
+class KeysetSource:
+    """Serve fetch(offset, limit) from a page function, seeking by cursor when possible.
+
+    Cursors for page boundaries already visited are remembered, so scrolling
+    forward page by page always seeks; only a jump to an unseen position
+    falls back to OFFSET.
+    """
+
+    def __init__(self, page_fn, key=lambda row: row[0]):
+        self.page_fn = page_fn
+        self.key = key
+        self._cursors = {0: None}
+
+    def fetch(self, offset, limit):
+        if offset in self._cursors:
+            page = self.page_fn(cursor=self._cursors[offset], page_size=limit)
+        else:
+            page = self.page_fn(cursor=None, page_size=limit, offset=offset)
+        if page.next_cursor is not None:
+            self._cursors[offset + len(page.rows)] = page.next_cursor
+        return [(self.key(row), row) for row in page.rows]
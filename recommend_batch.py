@@ -0,0 +1,116 @@
+"""
+Offline batch job that precomputes every member's recommendations.
+
+Scores all users of the current recommendation model in blocks (one matrix
+product per block, already-borrowed books masked, partial top-N selection),
+spreads the blocks over a thread pool (numpy releases the GIL inside the
+matrix products) and replaces the contents of the recommendations table in
+one transaction. RecommendationsGUI then reads a member's list with a single
+indexed lookup and only falls back to live scoring for members missing from
+the table.
+
+    python recommend_batch.py [--top-n 10] [--block-size 256] [--workers 4] [--retrain] [--cooccurrence]
+
+--cooccurrence also rebuilds the co-occurrence tables (see cooccurrence.py),
+for terminals running the item-item engine.
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import cooccurrence
+import matrix_builder
+import recommender
+from db import get_connection, write
+from db_init import DB_NAME, init_db
+
+logger = logging.getLogger(__name__)
+
+TOP_N = 10
+BLOCK_SIZE = 256
+
+
+def score_block(model, user_factors, borrowed_rows, borrowed_cols, start, stop, top_n):
+    """Top-N (user index, book id, rank, score) rows for users start..stop-1."""
+    scores = user_factors[start:stop] @ model.Vt
+    in_block = (borrowed_rows >= start) & (borrowed_rows < stop)
+    scores[borrowed_rows[in_block] - start, borrowed_cols[in_block]] = -np.inf
+    n = min(top_n, scores.shape[1])
+    top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    rows = []
+    for offset in range(stop - start):
+        if not user_factors[start + offset].any():
+            continue   # nothing the model knows about; the GUI falls back to popular books
+        for rank, (col, score) in enumerate(zip(top[offset], top_scores[offset]), 1):
+            if np.isfinite(score):
+                rows.append((start + offset, int(model.books[col]), rank, float(score)))
+    return rows
+
+
+def run(db_name=DB_NAME, top_n=TOP_N, block_size=BLOCK_SIZE, workers=None, retrain=False):
+    """Recompute the recommendations table. Returns (users scored, rows written)."""
+    conn = get_connection(db_name)
+    model = recommender.train(conn) if retrain else recommender.get_model(conn, db_name)
+    if model is None:
+        logger.info("No borrowings to learn from; recommendations table left unchanged")
+        return 0, 0
+    if retrain:
+        model.save(recommender.model_path(db_name))
+
+    pairs = matrix_builder.load_interactions(conn)
+    user_idx = pairs["username"].map(model.user_index)
+    known = user_idx.notna().to_numpy()
+    book_pos, hit = recommender._locate(model, pairs["book_id"].to_numpy()[known])
+    borrowed_rows, borrowed_cols = user_idx[known].to_numpy(dtype=np.int64)[hit], book_pos[hit]
+
+    user_factors = model.U * model.sigma
+    n_users = user_factors.shape[0]
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        blocks = [pool.submit(score_block, model, user_factors, borrowed_rows, borrowed_cols,
+                              start, min(start + block_size, n_users), top_n)
+                  for start in range(0, n_users, block_size)]
+        results = [row for block in blocks for row in block.result()]
+
+    version = model.folded_id
+    users = model.users.tolist()
+    rows = [(users[u], book_id, rank, score, version) for u, book_id, rank, score in results]
+
+    def _replace(conn):
+        conn.execute("DELETE FROM recommendations")
+        conn.executemany("INSERT INTO recommendations (username, book_id, rank, score, model_version) "
+                         "VALUES (?, ?, ?, ?, ?)", rows)
+    write(_replace, db_name)
+    return len({row[0] for row in rows}), len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute book recommendations for every member.")
+    parser.add_argument("--top-n", type=int, default=TOP_N, help="recommendations stored per member")
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE, help="users scored per matrix product")
+    parser.add_argument("--workers", type=int, default=None, help="scoring threads (default: CPU count)")
+    parser.add_argument("--retrain", action="store_true", help="retrain the model before scoring")
+    parser.add_argument("--cooccurrence", action="store_true", help="also rebuild the co-occurrence tables")
+    args = parser.parse_args()
+    # Shows which factorization backend was picked and how long it took
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s:%(name)s:%(message)s")
+    init_db()
+    started = time.perf_counter()
+    users, rows = run(top_n=args.top_n, block_size=args.block_size, workers=args.workers, retrain=args.retrain)
+    print(f"Stored {rows} recommendations for {users} members in {time.perf_counter() - started:.1f}s")
+    if args.cooccurrence:
+        started = time.perf_counter()
+        write(cooccurrence.rebuild, DB_NAME)
+        print(f"Rebuilt co-occurrence tables in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
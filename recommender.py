@@ -0,0 +1,320 @@
+"""
+SVD recommendation model, trained once and cached on disk.
+
+The factors of the user x book borrow matrix (U, sigma, Vt; see
+factorization.py for how the backend is chosen) and the
+user/book id maps are saved to a model file next to the database, stamped
+with the state of the borrowings table they were trained on (row count and
+highest id). Later calls, in this process or after a restart, reuse the
+model and only retrain once RETRAIN_THRESHOLD new borrowings have
+accumulated, or when borrowings have been deleted.
+
+Between retrains the model is kept fresh by folding in: users with new
+borrowings (including members who were not in the training data) get their
+row of U recomputed by projecting their borrow vector onto the item factors
+(least squares; x V / sigma for a plain SVD), and books that were added since training get a column of
+Vt the same way from the users who borrowed them, every ITEM_FOLD_INTERVAL
+new borrowings. The retrain itself runs on a background thread; callers keep
+using the folded-in model until it finishes. A fold-in builds a new model
+and swaps it in, so a model returned by get_model() never changes under
+recommend().
+
+    model = recommender.get_model(conn, db_name)
+    book_ids = recommender.recommend(conn, model, "alice", top_n=5)
+"""
+import copy
+import logging
+import os
+import threading
+
+import numpy as np
+
+import background
+import factorization
+import matrix_builder
+from db import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Bump when the saved layout changes so old model files are ignored
+MODEL_FORMAT = 3
+# Number of latent factors (capped by the matrix shape)
+FACTORS = 50
+# Factorization backend: "auto" picks by matrix size and density, or force
+# "dense", "randomized", "svds" or "als"
+METHOD = "auto"
+# Interaction weights: "binary", "count" or "recency" (see matrix_builder.py)
+WEIGHTING = "binary"
+# Retrain once this many borrowings were added since the model was trained
+RETRAIN_THRESHOLD = 50
+# Fold newly borrowed books into the item factors after this many new borrowings
+ITEM_FOLD_INTERVAL = 20
+
+_models = {}
+_lock = threading.Lock()
+_retraining = set()
+
+
+class Model:
+    def __init__(self, U, sigma, Vt, users, books, stamp, folded_id=None, items_folded_id=None,
+                 method="svds", reason="", seconds=0.0, regularization=0.0):
+        self.U = U
+        self.sigma = sigma
+        self.Vt = Vt
+        self.users = users
+        self.books = books
+        self.stamp = stamp
+        # Highest borrowing id already folded into U / into Vt
+        self.folded_id = stamp[1] if folded_id is None else folded_id
+        self.items_folded_id = stamp[1] if items_folded_id is None else items_folded_id
+        self.user_index = {u: i for i, u in enumerate(users.tolist())}
+        # How the factors were trained (factorization.factorize)
+        self.method = method
+        self.reason = reason
+        self.seconds = seconds
+        self.regularization = regularization
+        self._user_projector = None
+
+    @property
+    def user_projector(self):
+        """Least-squares fold-in matrix for user rows; rebuilt when Vt changes."""
+        if self._user_projector is None:
+            self._user_projector = factorization.fold_in_projector(self.sigma, self.Vt, self.regularization)
+        return self._user_projector
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, U=self.U, sigma=self.sigma, Vt=self.Vt, users=self.users, books=self.books,
+                     stamp=np.array([MODEL_FORMAT, *self.stamp, self.folded_id, self.items_folded_id], dtype=np.int64),
+                     training=np.array([self.method, self.reason]),
+                     timing=np.array([self.seconds, self.regularization]))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            stamp = data["stamp"].tolist()
+            if stamp[0] != MODEL_FORMAT:
+                return None
+            method, reason = data["training"].tolist()
+            seconds, regularization = data["timing"].tolist()
+            return cls(data["U"], data["sigma"], data["Vt"], data["users"], data["books"], tuple(stamp[1:3]), *stamp[3:],
+                       method=method, reason=reason, seconds=seconds, regularization=regularization)
+
+
+def _replace(model, **changes):
+    """A shallow copy of model with changes applied; published models are never modified."""
+    new = copy.copy(model)
+    new.__dict__.update(changes)
+    return new
+
+
+def model_path(db_name):
+    return os.path.splitext(db_name)[0] + ".recs.npz"
+
+
+def borrowings_stamp(conn):
+    """(row count, highest id) of borrowings; the version a model was trained on."""
+    count, max_id = conn.execute("SELECT COUNT(*), IFNULL(MAX(id), 0) FROM borrowings").fetchone()
+    return count, max_id
+
+
+def is_stale(model, stamp):
+    count, max_id = stamp
+    trained_count, trained_max_id = model.stamp
+    if count < trained_count or max_id < trained_max_id:
+        return True   # borrowings were deleted
+    return max_id - trained_max_id >= RETRAIN_THRESHOLD
+
+
+def train(conn, method=None):
+    """Factorize the current borrow matrix. Returns None when there is nothing to learn from."""
+    stamp = borrowings_stamp(conn)
+    users = [row[0] for row in conn.execute("SELECT username FROM users ORDER BY username")]
+    books = [row[0] for row in conn.execute("SELECT id FROM books ORDER BY id")]
+    if len(users) < 2 or len(books) < 2:
+        return None
+    interactions = matrix_builder.build(conn, WEIGHTING, users, books)
+    matrix = interactions.matrix
+    if not matrix.nnz:
+        return None
+    k = min(FACTORS, min(matrix.shape) - 1)
+    result = factorization.factorize(matrix, k, method or METHOD)
+    return Model(result.U, result.sigma, result.Vt, interactions.users, interactions.books, stamp,
+                 method=result.method, reason=result.reason, seconds=result.seconds,
+                 regularization=result.regularization)
+
+
+def fold_in_users(conn, model, usernames):
+    """model with the U rows of usernames recomputed (or added) from their current borrows."""
+    if not usernames:
+        return model
+    df = matrix_builder.load_interactions(conn, WEIGHTING, where=f"username IN ({','.join('?' for _ in usernames)})",
+                                          params=usernames)
+    pos, hit = _locate(model, df["book_id"].to_numpy())
+    order = {username: i for i, username in enumerate(usernames)}
+    user_rows = df["username"].map(order).to_numpy()[hit]
+    weights = df["weight"].to_numpy()[hit]
+    rows = np.zeros((len(usernames), model.U.shape[1]))
+    np.add.at(rows, user_rows, model.user_projector[pos[hit]] * weights[:, None])
+    U, users, user_index = model.U.copy(), model.users, model.user_index
+    added_users, added_rows = [], []
+    for username, row in zip(usernames, rows):
+        idx = user_index.get(username)
+        if idx is None:
+            added_users.append(username)
+            added_rows.append(row)
+        else:
+            U[idx] = row
+    if added_users:
+        user_index = dict(user_index)
+        for username in added_users:
+            user_index[username] = len(user_index)
+        U = np.vstack([U, added_rows])
+        users = np.concatenate([users, np.array(added_users)])
+    return _replace(model, U=U, users=users, user_index=user_index)
+
+
+def fold_in_items(conn, model, book_ids):
+    """model with Vt columns added for book_ids from the factors of the users who borrowed them."""
+    book_ids = np.unique(np.asarray(book_ids, dtype=np.int64))
+    new_ids = book_ids[~_locate(model, book_ids)[1]]
+    if not new_ids.size:
+        return model
+    df = matrix_builder.load_interactions(conn, WEIGHTING, where=f"book_id IN ({','.join('?' for _ in new_ids)})",
+                                          params=new_ids.tolist())
+    user_idx = df["username"].map(model.user_index)
+    known = user_idx.notna().to_numpy()
+    book_cols = np.searchsorted(new_ids, df["book_id"].to_numpy()[known])
+    projector = factorization.item_projector(model.U, model.sigma, model.regularization)
+    columns = np.zeros((new_ids.size, model.U.shape[1]))
+    np.add.at(columns, book_cols,
+              projector[user_idx[known].to_numpy(dtype=np.int64)] * df["weight"].to_numpy()[known][:, None])
+    books = np.concatenate([model.books, new_ids])
+    Vt = np.hstack([model.Vt, columns.T])
+    order = np.argsort(books, kind="stable")
+    return _replace(model, books=books[order], Vt=Vt[:, order], _user_projector=None)
+
+
+def fold_in(conn, model, max_id):
+    """A copy of model brought up to borrowing id max_id without retraining.
+
+    model itself is never modified, so readers holding it need no lock.
+    """
+    if max_id <= model.folded_id:
+        return model
+    touched = [row[0] for row in conn.execute(
+        "SELECT DISTINCT username FROM borrowings WHERE id > ?", (model.folded_id,))]
+    model = fold_in_users(conn, model, touched)
+    if max_id - model.items_folded_id >= ITEM_FOLD_INTERVAL:
+        new_books = [row[0] for row in conn.execute(
+            "SELECT DISTINCT book_id FROM borrowings WHERE id > ?", (model.items_folded_id,))]
+        model = fold_in_items(conn, model, new_books)
+        # The touched users may have borrowed the books just added
+        model = fold_in_users(conn, model, touched)
+        model = _replace(model, items_folded_id=max_id)
+    logger.debug("Folded %d users into the recommendation model up to borrowing %d", len(touched), max_id)
+    return _replace(model, folded_id=max_id)
+
+
+def _retrain_in_background(db_name):
+    def run():
+        try:
+            with get_connection(db_name) as conn:
+                model = train(conn)
+            if model is not None:
+                model.save(model_path(db_name))
+            with _lock:
+                _models[db_name] = model
+        except Exception:
+            logger.exception("Background retrain of the recommendation model failed")
+        finally:
+            with _lock:
+                _retraining.discard(db_name)
+
+    if db_name not in _retraining:
+        _retraining.add(db_name)
+        # On the shared worker pool, whose threads keep their connection between jobs
+        background.submit(run)
+
+
+def get_model(conn, db_name):
+    """The current model for db_name, folded up to date.
+
+    Only the very first model is trained on the calling thread; a stale model
+    keeps serving (with fold-ins) while its replacement trains in the background.
+    """
+    stamp = borrowings_stamp(conn)
+    with _lock:
+        model = _models.get(db_name)
+        path = model_path(db_name)
+        if model is None and os.path.exists(path):
+            try:
+                model = Model.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Ignoring unreadable model file %s: %s", path, e)
+                model = None
+        if model is None:
+            model = train(conn)
+            if model is not None:
+                try:
+                    model.save(path)
+                except OSError as e:
+                    logger.warning("Could not save model file %s: %s", path, e)
+        elif is_stale(model, stamp):
+            _retrain_in_background(db_name)
+        if model is not None:
+            model = fold_in(conn, model, stamp[1])
+        _models[db_name] = model
+        return model
+
+
+def _locate(model, book_ids):
+    """(positions in model.books, mask of the book_ids the model knows); model.books is sorted."""
+    book_ids = np.asarray(book_ids, dtype=np.int64)
+    if not model.books.size:
+        return np.zeros(book_ids.size, dtype=np.int64), np.zeros(book_ids.size, dtype=bool)
+    pos = np.minimum(np.searchsorted(model.books, book_ids), model.books.size - 1)
+    return pos, model.books[pos] == book_ids
+
+
+def _book_positions(model, book_ids):
+    """Positions in model.books of those book_ids the model knows."""
+    pos, hit = _locate(model, book_ids)
+    return pos[hit]
+
+
+def user_scores(model, user_idx):
+    """Predicted scores of every book for one user: (U[u] * sigma) @ Vt, never the full matrix."""
+    return (model.U[user_idx] * model.sigma) @ model.Vt
+
+
+def mask_books(model, scores, book_ids):
+    """Set the scores of book_ids to -inf in place (model.books is sorted by id)."""
+    scores[_book_positions(model, list(book_ids))] = -np.inf
+    return scores
+
+
+def top_indices(scores, n):
+    """Indices of the n highest finite scores, best first, using a partial sort."""
+    n = min(n, scores.size)
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, n - 1)[:n]
+    idx = idx[np.argsort(-scores[idx], kind="stable")]
+    return idx[np.isfinite(scores[idx])]
+
+
+def recommend(conn, model, username, top_n=5):
+    """Ids of the top_n books username has not borrowed yet, best first."""
+    user_idx = model.user_index.get(username)
+    if user_idx is None:
+        return []
+    scores = user_scores(model, user_idx)
+    if not scores.any():
+        return []   # nothing borrowed that the model knows about yet
+    borrowed = [row[0] for row in conn.execute(
+        "SELECT DISTINCT book_id FROM borrowings WHERE username = ? AND book_id IS NOT NULL", (username,))]
+    mask_books(model, scores, borrowed)
+    return model.books[top_indices(scores, top_n)].tolist()
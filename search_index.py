@@ -0,0 +1,70 @@
+"""
+In-memory token/prefix index used to answer search-as-you-type from memory.
+
+Built once from a list of rows; each row's text fields are split into
+lower-case word tokens. A query matches a row when every query word is a
+prefix of one of the row's tokens ("tolk hob" matches "The Hobbit" by
+"J.R.R. Tolkien"). When a query only extends the previous one (the usual
+case while typing) the previous result set is narrowed instead of going
+back to the full index.
+"""
+import re
+from bisect import bisect_left
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _WORD.findall(str(text).lower()) if text is not None else []
+
+
+class BookSearchIndex:
+    def __init__(self, rows, fields=(1, 2)):
+        """rows: sequence of tuples; fields: positions of the text columns to index."""
+        self.rows = list(rows)
+        postings = {}
+        self._row_tokens = []
+        for pos, row in enumerate(self.rows):
+            tokens = set()
+            for field in fields:
+                tokens.update(tokenize(row[field]))
+            self._row_tokens.append(tuple(tokens))
+            for token in tokens:
+                postings.setdefault(token, []).append(pos)
+        self._postings = postings
+        self._tokens = sorted(postings)
+        self._last_query = None
+        self._last_positions = None
+
+    def _prefix_positions(self, term):
+        # All tokens starting with term form one contiguous run of the sorted token list
+        positions = set()
+        i = bisect_left(self._tokens, term)
+        while i < len(self._tokens) and self._tokens[i].startswith(term):
+            positions.update(self._postings[self._tokens[i]])
+            i += 1
+        return positions
+
+    def _row_matches(self, pos, terms):
+        tokens = self._row_tokens[pos]
+        return all(any(token.startswith(term) for token in tokens) for term in terms)
+
+    def search(self, query):
+        """Return the rows matching query, in their original order."""
+        query = query.lower()
+        terms = tokenize(query)
+        if not terms:
+            positions = range(len(self.rows))
+        elif self._last_positions is not None and self._last_query and query.startswith(self._last_query):
+            positions = [pos for pos in self._last_positions if self._row_matches(pos, terms)]
+        else:
+            matched = None
+            for term in sorted(terms, key=len, reverse=True):
+                found = self._prefix_positions(term)
+                matched = found if matched is None else matched & found
+                if not matched:
+                    break
+            positions = sorted(matched)
+        self._last_query = query if terms else None
+        self._last_positions = positions if terms else None
+        return [self.rows[pos] for pos in positions]
@@ -0,0 +1,93 @@
+"""
+Startup timing and lazy loading of the scientific stack.
+
+numpy, scipy and pandas are only needed for recommendations, so nothing on
+the path to the main menu imports them. load_recommender() imports them
+(and recommender.py) on first use; warm_up() does the same on a worker
+thread shortly after the menu is on screen, so the first recommendation
+request normally finds everything loaded.
+
+mark() records how long after process start a milestone was reached and
+report() summarizes the marks and the time spent importing each heavy
+module. Running this file prints the slowest imports of main.py in a fresh
+interpreter (python -X importtime), to spot startup regressions:
+
+    python startup.py
+"""
+import importlib
+import logging
+import re
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STARTED = time.perf_counter()
+
+# Imported in this order by load_recommender(), each timed separately
+HEAVY_MODULES = ("numpy", "scipy.sparse", "scipy.sparse.linalg", "pandas")
+# Delay between showing the menu and warming the scientific stack in the background
+WARMUP_DELAY_MS = 1500
+
+marks = {}
+import_times = {}
+_lock = threading.Lock()
+_recommender = None
+
+
+def mark(label):
+    """Record that label was reached, in seconds since this module was first imported."""
+    marks[label] = time.perf_counter() - _STARTED
+    logger.info("Startup: %s after %.3fs", label, marks[label])
+
+
+def load_recommender():
+    """Import (once) and return the recommender module, timing each heavy import."""
+    global _recommender
+    with _lock:
+        if _recommender is None:
+            for name in HEAVY_MODULES + ("recommender",):
+                if name in sys.modules:
+                    continue
+                started = time.perf_counter()
+                importlib.import_module(name)
+                import_times[name] = time.perf_counter() - started
+            _recommender = sys.modules["recommender"]
+            logger.info("Loaded the recommendation stack: %s", report())
+        return _recommender
+
+
+def warm_up(widget, delay_ms=WARMUP_DELAY_MS):
+    """Load the recommendation stack on a worker thread once widget has been idle for delay_ms."""
+    import background
+
+    widget.after(delay_ms, lambda: background.run(widget, load_recommender))
+
+
+def report():
+    parts = [f"{label} {seconds:.3f}s" for label, seconds in marks.items()]
+    parts += [f"import {name} {seconds:.3f}s" for name, seconds in import_times.items()]
+    return ", ".join(parts) or "nothing recorded"
+
+
+def importtime_report(module="main", top=15):
+    """(total seconds, [(cumulative seconds, module), ...]) for importing module in a fresh interpreter."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            rows.append((int(match.group(1)) / 1e6, len(match.group(2)), match.group(3)))
+    total = sum(seconds for seconds, depth, _ in rows if depth == 1)
+    slowest = sorted(((seconds, name) for seconds, _, name in rows), reverse=True)[:top]
+    return total, slowest
+
+
+if __name__ == "__main__":
+    total, slowest = importtime_report()
+    print(f"import main: {total:.3f}s")
+    for seconds, name in slowest:
+        print(f"  {seconds:8.3f}s  {name}")
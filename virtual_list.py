@@ -0,0 +1,272 @@
+"""
+Virtualized (windowed) list views for very large result sets.
+
+Only the rows that fit in the visible area exist as Treeview items. The data
+comes from a source: a total row count plus fetch(offset, limit) returning
+(key, values) pairs, so rows can be paged straight out of SQLite as the user
+scrolls. Fetched pages are kept in a small LRU cache. The scrollbar is
+driven by us and stays proportional to the total row count, and the mouse
+wheel, PageUp/PageDown and the arrow keys at the edges scroll the window.
+
+    view = VirtualTreeview(tree, scrollbar)
+    view.set_source(count_fn, fetch_fn)   # rows paged from the database
+    view.set_rows(rows)                   # or rows already in memory
+
+RecycledRowList does the same for hand-built rows of widgets (label and
+button rows): a fixed pool of row widgets sized to the visible area is
+created once and re-bound to new data on scroll or search.
+"""
+from collections import OrderedDict
+
+
+class _WindowedView:
+    """Paging, caching and scrolling shared by the windowed views."""
+
+    def __init__(self, scrollbar, visible, page_size=200, cache_pages=16):
+        self.scrollbar = scrollbar
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+        self.visible = visible
+        self.total = 0
+        self.offset = 0
+        self._count = lambda: 0
+        self._fetch = lambda offset, limit: []
+        self._pages = OrderedDict()
+        scrollbar.configure(command=self.yview)
+
+    def bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", lambda e: self._scroll_units(-3))
+        widget.bind("<Button-5>", lambda e: self._scroll_units(3))
+
+    # -- sources ---------------------------------------------------------
+
+    def set_source(self, count, fetch):
+        """count() -> total rows; fetch(offset, limit) -> list of (key, values)."""
+        self._count = count
+        self._fetch = fetch
+        self.offset = 0
+        self.reset()
+        self.refresh()
+
+    def reset(self):
+        """Hook for subclasses: forget per-source state when the source changes."""
+
+    def set_rows(self, rows, key=lambda row: row[0], values=lambda row: row):
+        """Show rows that are already in memory."""
+        self.set_source(lambda: len(rows),
+                        lambda offset, limit: [(key(r), values(r)) for r in rows[offset:offset + limit]])
+
+    def refresh(self):
+        """Re-count and re-fetch from the source, keeping the scroll position where possible."""
+        self._pages.clear()
+        self.total = self._count()
+        self.offset = self._clamp(self.offset)
+        self.render()
+
+    # -- data ------------------------------------------------------------
+
+    def _page(self, number):
+        page = self._pages.get(number)
+        if page is None:
+            page = [(str(k), v) for k, v in self._fetch(number * self.page_size, self.page_size)]
+            self._pages[number] = page
+            while len(self._pages) > self.cache_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(number)
+        return page
+
+    def _rows(self, start, stop):
+        rows = []
+        number = start // self.page_size
+        while start < stop:
+            page = self._page(number)
+            begin = start - number * self.page_size
+            chunk = page[begin:begin + (stop - start)]
+            if not chunk:
+                break
+            rows.extend(chunk)
+            start += len(chunk)
+            number += 1
+        return rows
+
+    def cached_values(self, key):
+        for page in self._pages.values():
+            for row_key, values in page:
+                if row_key == key:
+                    return list(values)
+        return None
+
+    # -- scrolling -------------------------------------------------------
+
+    def _clamp(self, offset):
+        return max(0, min(offset, self.total - self.visible))
+
+    def update_scrollbar(self):
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, min(1.0, (self.offset + self.visible) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def render(self):
+        raise NotImplementedError
+
+    def scroll_to(self, offset):
+        offset = self._clamp(offset)
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def yview(self, *args):
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= max(1, self.visible - 1)
+            self._scroll_units(amount)
+
+    def _scroll_units(self, amount):
+        self.scroll_to(self.offset + amount)
+        return "break"
+
+    def _on_wheel(self, event):
+        return self._scroll_units(-3 if event.delta > 0 else 3)
+
+    def resize(self, visible):
+        visible = max(1, visible)
+        if visible != self.visible:
+            self.visible = visible
+            self.offset = self._clamp(self.offset)
+            self.render()
+
+
+class VirtualTreeview(_WindowedView):
+    def __init__(self, tree, scrollbar, page_size=200, cache_pages=16):
+        super().__init__(scrollbar, int(tree.cget("height")) or 10, page_size, cache_pages)
+        self.tree = tree
+        self.selected_key = None
+        self._rendering = False
+
+        tree.bind("<Configure>", self._on_resize, add="+")
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        self.bind_wheel(tree)
+        for key in ("<Up>", "<Down>", "<Prior>", "<Next>"):
+            tree.bind(key, self._on_key)
+
+    def reset(self):
+        self.selected_key = None
+
+    def selected_values(self):
+        """Values of the selected row, even if it has been scrolled out of view."""
+        if self.selected_key is None:
+            return None
+        if self.tree.exists(self.selected_key):
+            return self.tree.item(self.selected_key)["values"]
+        return self.cached_values(self.selected_key)
+
+    def render(self):
+        self._rendering = True
+        try:
+            self.tree.delete(*self.tree.get_children())
+            for key, values in self._rows(self.offset, min(self.offset + self.visible, self.total)):
+                self.tree.insert("", "end", iid=key, values=values)
+            if self.selected_key is not None and self.tree.exists(self.selected_key):
+                self.tree.selection_set(self.selected_key)
+        finally:
+            # Selection events from the delete/insert above are delivered later
+            self.tree.after_idle(self._done_rendering)
+        self.update_scrollbar()
+
+    def _done_rendering(self):
+        self._rendering = False
+
+    def _on_resize(self, event):
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children else None
+        if not bbox:
+            return
+        _, top, _, row_height = bbox
+        self.resize((event.height - top) // max(1, row_height))
+
+    def _on_select(self, event):
+        if self._rendering:
+            return
+        selection = self.tree.selection()
+        self.selected_key = selection[0] if selection else None
+
+    def _focus_row(self, index):
+        children = self.tree.get_children()
+        if children:
+            key = children[index]
+            self.selected_key = key
+            self.tree.selection_set(key)
+            self.tree.focus(key)
+
+    def _on_key(self, event):
+        children = self.tree.get_children()
+        focus = self.tree.focus()
+        if event.keysym == "Up" and self.offset > 0 and (not children or focus == children[0]):
+            self.scroll_to(self.offset - 1)
+            self._focus_row(0)
+            return "break"
+        if event.keysym == "Down" and children and focus == children[-1] and self.offset + self.visible < self.total:
+            self.scroll_to(self.offset + 1)
+            self._focus_row(-1)
+            return "break"
+        if event.keysym in ("Prior", "Next"):
+            index = children.index(focus) if focus in children else 0
+            step = max(1, self.visible - 1)
+            self.scroll_to(self.offset - step if event.keysym == "Prior" else self.offset + step)
+            self._focus_row(min(index, len(self.tree.get_children()) - 1))
+            return "break"
+        return None
+
+
+class RecycledRowList(_WindowedView):
+    """A list of widget rows backed by a fixed pool that is re-bound instead of rebuilt.
+
+    make_row(parent) creates one empty row widget (packed by this class);
+    bind_row(row, key, values) fills it with data. Rows are only created when
+    the visible area grows; scrolling and new searches just re-bind them.
+    """
+
+    def __init__(self, container, scrollbar, make_row, bind_row, row_height=60, page_size=200, cache_pages=16):
+        super().__init__(scrollbar, max(1, container.winfo_height() // row_height), page_size, cache_pages)
+        self.container = container
+        self.make_row = make_row
+        self.bind_row = bind_row
+        self.row_height = row_height
+        self.pool = []
+        container.bind("<Configure>", self._on_resize, add="+")
+        self.bind_wheel(container)
+
+    def _row(self, index):
+        while len(self.pool) <= index:
+            row = self.make_row(self.container)
+            self.bind_wheel(row)
+            for child in row.winfo_children():
+                self.bind_wheel(child)
+            self.pool.append(row)
+        return self.pool[index]
+
+    def render(self):
+        rows = self._rows(self.offset, min(self.offset + self.visible, self.total))
+        for index, (key, values) in enumerate(rows):
+            row = self._row(index)
+            self.bind_row(row, key, values)
+            if not row.winfo_manager():
+                row.pack(fill="x", pady=8, padx=10)
+        for row in self.pool[len(rows):]:
+            if row.winfo_manager():
+                row.pack_forget()
+        self.update_scrollbar()
+
+    def _on_resize(self, event):
+        if self.pool and self.pool[0].winfo_height() > 1:
+            # Measured height of a real row plus its pady
+            self.row_height = self.pool[0].winfo_height() + 16
+        self.resize(event.height // max(1, self.row_height))